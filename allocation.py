@@ -0,0 +1,179 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from scoring import INPUT_COLUMNS, TIERS, effort_encoded, effort_record, encode, score_record
+
+# Which clients to pursue with limited consultant capacity.
+#
+# Every client is a knapsack item: its value is the Estimated Revenue
+# Opportunity (optionally weighted by Priority Tier), its weight the effort
+# the rules spec estimates from its maturity profile (whole consultant-weeks).
+#
+# solve() ranks clients by value per week and fills capacity greedily up to
+# the first client that doesn't fit (the break item). Clients ranked well
+# above the break are kept and those well below are left out; the CORE
+# clients on either side of it are decided exactly by a dynamic program over
+# the remaining capacity, and whatever capacity is then left is filled
+# greedily from the rest. The LP relaxation (Dantzig) bound tells how far the
+# plan can be from optimal at most.
+#
+# The ranking is kept per set of tier weights, so changing the capacity only
+# re-runs the small core DP. A new portfolio version patches the client
+# arrays for the changed clients instead of recomputing them (see
+# portfolio.allocator()).
+
+CORE = 256
+
+
+class Allocator:
+    def __init__(self, clients, revenue, tiers, efforts):
+        self.clients = np.asarray(clients, dtype=object)
+        self.revenue = np.asarray(revenue, dtype=float)
+        self.tiers = np.asarray(tiers)
+        self.efforts = np.asarray(efforts, dtype=np.int64)
+        # Shared by sessions through portfolio's cache, so rankings are
+        # looked up and evicted under a lock
+        self._rankings = {}
+        self._rankings_lock = threading.Lock()
+
+    @classmethod
+    def from_results(cls, df_results, clients):
+        """From scored() results and the client records they were scored from."""
+        codes = encode(pd.DataFrame(clients, columns=INPUT_COLUMNS))
+        return cls(df_results["Client"].to_numpy(), df_results["Estimated Revenue Opportunity"].to_numpy(),
+                   df_results["Priority Tier"].cat.codes.to_numpy(), effort_encoded(codes))
+
+    def with_tiers(self, tiers):
+        """The same clients under other Priority Tier codes, e.g. portfolio percentile tiers."""
+        return Allocator(self.clients, self.revenue, tiers, self.efforts)
+
+    def apply(self, changes):
+        """A new Allocator with store Changes applied (inserts, edits, deletes)."""
+        clients, revenue, tiers, efforts = self.clients, self.revenue, self.tiers, self.efforts
+        for change in changes:
+            if change.old is not None:
+                clients, revenue, tiers, efforts = (np.delete(a, change.position)
+                                                    for a in (clients, revenue, tiers, efforts))
+            if change.new is not None:
+                row, _ = score_record(change.new)
+                new = (row["Client"], row["Estimated Revenue Opportunity"], TIERS.index(row["Priority Tier"]),
+                       effort_record(change.new))
+                clients, revenue, tiers, efforts = (np.insert(a, change.position, value)
+                                                    for a, value in zip((clients, revenue, tiers, efforts), new))
+        return Allocator(clients, revenue, tiers, efforts)
+
+    # --- Ranking ---
+    def values(self, tier_weights=None):
+        if tier_weights is None:
+            return self.revenue
+        return self.revenue * np.array([tier_weights.get(tier, 1.0) for tier in TIERS])[self.tiers]
+
+    def _ranking(self, tier_weights):
+        key = tuple(sorted(tier_weights.items())) if tier_weights else None
+        with self._rankings_lock:
+            ranking = self._rankings.get(key)
+        if ranking is None:
+            # Sorted outside the lock; two sessions may both sort, the last one is kept
+            values = self.values(tier_weights)
+            order = np.argsort(-(values / self.efforts), kind="stable")
+            ranking = (values, order, np.cumsum(self.efforts[order]))
+            with self._rankings_lock:
+                # Only the latest few weightings are worth keeping
+                if key not in self._rankings and len(self._rankings) >= 8:
+                    self._rankings.pop(next(iter(self._rankings)))
+                self._rankings[key] = ranking
+        return ranking
+
+    # --- Solving ---
+    def solve(self, capacity, tier_weights=None, core=CORE):
+        """Pick clients to maximise (weighted) revenue within capacity weeks.
+
+        Returns a dict with the selected mask, the value and effort of the
+        plan, the upper bound on any plan's value and the resulting gap.
+        """
+        values, order, cumulative = self._ranking(tier_weights)
+        capacity = int(capacity)
+        selected = np.zeros(len(values), dtype=bool)
+        if not len(values) or capacity <= 0:
+            return _plan(selected, values, self.efforts, capacity, 0.0)
+
+        # Break item: the first ranked client the greedy fill cannot take
+        brk = int(np.searchsorted(cumulative, capacity, side="right"))
+        if brk == len(order):
+            selected[:] = True
+            return _plan(selected, values, self.efforts, capacity, float(values.sum()))
+        ratio = values[order[brk]] / self.efforts[order[brk]]
+        used = cumulative[brk - 1] if brk else 0
+        bound = float(values[order[:brk]].sum() + (capacity - used) * ratio)
+
+        lo, hi = max(0, brk - core), min(len(order), brk + core)
+        selected[order[:lo]] = True
+        left = capacity - (cumulative[lo - 1] if lo else 0)
+        window = order[lo:hi]
+        chosen = _knapsack(values[window], self.efforts[window], left)
+        selected[window[chosen]] = True
+        left -= int(self.efforts[window[chosen]].sum())
+
+        # Fill what is left from the clients ranked below the core
+        for i in order[hi:]:
+            if left <= 0:
+                break
+            if self.efforts[i] <= left:
+                selected[i] = True
+                left -= int(self.efforts[i])
+        return _plan(selected, values, self.efforts, capacity, bound)
+
+    def plan_frame(self, plan, df_maturity=None):
+        """Selected clients, best value per week first, with their roadmap if given."""
+        values = plan["values"]
+        df = pd.DataFrame({
+            "Client": self.clients,
+            "Estimated Revenue Opportunity": self.revenue,
+            "Priority Tier": pd.Categorical.from_codes(self.tiers, TIERS),
+            "Effort (weeks)": self.efforts,
+            "Value per Week": values / self.efforts,
+        })
+        if df_maturity is not None:
+            df["AI Roadmap"] = df_maturity["AI Roadmap"].to_numpy()
+        df = df[plan["selected"]]
+        return df.sort_values("Value per Week", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def _knapsack(values, efforts, capacity):
+    """Exact 0/1 knapsack over a few items; returns the indices taken."""
+    capacity = int(min(capacity, efforts.sum()))
+    if capacity <= 0:
+        return np.array([], dtype=np.int64)
+    best = np.zeros(capacity + 1)
+    take = np.zeros((len(values), capacity + 1), dtype=bool)
+    for i, (value, effort) in enumerate(zip(values, efforts)):
+        if effort > capacity:
+            continue
+        candidate = best[:capacity + 1 - effort] + value
+        better = candidate > best[effort:]
+        take[i, effort:] = better
+        best[effort:] = np.where(better, candidate, best[effort:])
+    chosen = []
+    c = capacity
+    for i in range(len(values) - 1, -1, -1):
+        if take[i, c]:
+            chosen.append(i)
+            c -= efforts[i]
+    return np.array(chosen[::-1], dtype=np.int64)
+
+
+def _plan(selected, values, efforts, capacity, bound):
+    value = float(values[selected].sum())
+    bound = max(bound, value)
+    return {
+        "selected": selected,
+        "values": values,
+        "capacity": capacity,
+        "value": value,
+        "effort": int(efforts[selected].sum()),
+        "count": int(selected.sum()),
+        "upper_bound": bound,
+        "gap": (bound - value) / bound if bound else 0.0,
+    }
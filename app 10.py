@@ -1,26 +1,26 @@
 
 import streamlit as st
-import pandas as pd
-import altair as alt
-import openai
-import json
-import os
+import portfolio
 
 st.set_page_config(page_title="R&D Opportunity Explorer", layout="wide")
 DATA_FILE = "client_data.json"
 st.markdown("<style>body { font-family: 'Segoe UI'; }</style>", unsafe_allow_html=True)
 
+# pandas, altair, openai and the KPI/scoring modules are imported where they
+# are first needed, so a run with no clients or no question only loads Streamlit.
+store = portfolio.get_store(DATA_FILE)
+
 def load_clients():
-    if "clients" not in st.session_state:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, "r") as f:
-                st.session_state.clients = json.load(f)
-        else:
-            st.session_state.clients = []
+    # Re-read only when another session has committed a newer version
+    st.session_state.clients_version, st.session_state.clients = store.read()
+
+def add_client(record):
+    # Re-assessing a client replaces its record instead of adding a duplicate
+    st.session_state.clients_version, st.session_state.clients = store.upsert(record)
 
-def save_clients():
-    with open(DATA_FILE, "w") as f:
-        json.dump(st.session_state.clients, f)
+def get_kpis():
+    # Shared per version; a keyed write only folds the changed client in or out
+    return portfolio.kpis(DATA_FILE, st.session_state.clients_version, st.session_state.clients)
 
 load_clients()
 
@@ -46,7 +46,7 @@ with st.sidebar.form("client_form"):
 
     submitted = st.form_submit_button("Add Client")
     if submitted and client_name:
-        st.session_state.clients.append({
+        add_client({
             "Client": client_name,
             "R&D Spend": rd_spend,
             "Footprint": footprint,
@@ -60,25 +60,33 @@ with st.sidebar.form("client_form"):
             "AI Maturity": ai_maturity,
             "AI Adoption": ai_adoption
         })
-        save_clients()
         st.success(f"{client_name} added successfully!")
 
 st.sidebar.markdown("---")
 if st.sidebar.button("Reset All Client Data"):
+    st.session_state.clients_version = store.reset(reason="sidebar reset")
     st.session_state.clients = []
-    if os.path.exists(DATA_FILE):
-        os.remove(DATA_FILE)
-    st.experimental_rerun()
-
-if st.session_state.clients:
-    df = pd.DataFrame(st.session_state.clients)
-
+    st.rerun()
+
+# One frame per portfolio version, shared by every section and session
+@st.cache_resource(max_entries=4)
+def portfolio_frame(version, _clients):
+    import pandas as pd
+    return pd.DataFrame(_clients)
+
+# --- Dashboard sections ---
+# The GPT panel is a fragment: typing a key or question reruns only that
+# panel, not the KPIs, table and chart above it.
+def kpi_header():
     st.header("Client Portfolio Overview")
+    kpis = get_kpis()
     kpi1, kpi2, kpi3 = st.columns(3)
-    kpi1.metric("Total Clients", len(df))
-    kpi2.metric("Total R&D Spend", f"${df['R&D Spend'].sum():,.0f}")
-    avg_ai = df[["AI Appetite", "AI Maturity", "AI Adoption"]].applymap(lambda x: {"Low": 1, "Medium": 2, "High": 3}[x]).mean().mean()
-    kpi3.metric("Avg. AI Maturity Score", f"{avg_ai:.1f} / 3")
+    kpi1.metric("Total Clients", kpis.count)
+    kpi2.metric("Total R&D Spend", f"${kpis.total_spend:,.0f}")
+    kpi3.metric("Avg. AI Maturity Score", f"{kpis.avg_ai_maturity:.1f} / 3")
+
+def portfolio_section(df):
+    import altair as alt
 
     st.subheader("Client Table")
     st.dataframe(df, use_container_width=True)
@@ -91,14 +99,52 @@ if st.session_state.clients:
     ).properties(height=400)
     st.altair_chart(bar, use_container_width=True)
 
+# Profiles plus scores for GPT query plans, one per portfolio version
+@st.cache_resource(max_entries=4)
+def query_table(version, _clients):
+    from query_plan import portfolio_table
+    df_results, df_maturity = portfolio.scored(DATA_FILE, version, _clients)
+    return portfolio_table(_clients, df_results, df_maturity)
+
+@st.fragment
+def gpt_section():
     st.markdown("### Ask GPT-4 about your clients")
     api_key = st.text_input("Enter your OpenAI API Key", type="password")
     query = st.text_area("Ask a question like: 'Who is most ready for GenAI scale-up?'")
+    mode = st.radio("Answer with", ["Query plan", "Free text"], horizontal=True,
+                    help="Query plan: GPT-4 sees only the column schema and the plan runs here. "
+                         "Free text: the whole client table is sent in the prompt, so it only suits small portfolios.")
 
     if st.button("Ask GPT-4") and query and api_key:
+        if mode == "Free text":
+            free_text_answer(api_key, query)
+            return
+        # GPT-4 only sees the column schema and answers with a query plan;
+        # the plan runs here on the scored portfolio, whatever its size
+        import query_plan
         try:
-            client = openai.OpenAI(api_key=api_key)
-            prompt = f"""You are an R&D data strategy assistant.
+            import openai
+            complete = query_plan.openai_complete(openai.OpenAI(api_key=api_key), model="gpt-4")
+            plan, answer = query_plan.ask(
+                query, query_table(st.session_state.clients_version, st.session_state.clients), complete)
+        except query_plan.PlanError as e:
+            st.error(f"GPT-4 returned a query plan that can't be run: {e}")
+        except Exception as e:
+            st.error(f"Error: {e}")
+        else:
+            st.markdown("**GPT-4 Answer:**")
+            if plan["explanation"]:
+                st.write(plan["explanation"])
+            st.dataframe(answer, use_container_width=True)
+            with st.expander("Query plan"):
+                st.json(plan)
+
+def free_text_answer(api_key, query):
+    df = portfolio_frame(st.session_state.clients_version, st.session_state.clients)
+    try:
+        import openai
+        client = openai.OpenAI(api_key=api_key)
+        prompt = f"""You are an R&D data strategy assistant.
 
 Here is a table of client data:
 
@@ -107,15 +153,20 @@ Here is a table of client data:
 Answer this question based on the table above:
 {query}
 """
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-                max_tokens=600
-            )
-            st.markdown("**GPT-4 Answer:**")
-            st.write(response.choices[0].message.content)
-        except Exception as e:
-            st.error(f"Error: {e}")
+        response = client.chat.completions.create(
+            model="gpt-4",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=600
+        )
+        st.markdown("**GPT-4 Answer:**")
+        st.write(response.choices[0].message.content)
+    except Exception as e:
+        st.error(f"Error: {e}")
+
+if st.session_state.clients:
+    kpi_header()
+    portfolio_section(portfolio_frame(st.session_state.clients_version, st.session_state.clients))
+    gpt_section()
 else:
     st.info("Start by adding a client from the sidebar.")
@@ -1,6 +1,12 @@
 
 import streamlit as st
 import pandas as pd
+from scoring import AI_CATEGORIES, COMPONENTS, score_record
+
+@st.cache_resource
+def get_optimizer():
+    from upgrades import UpgradeOptimizer
+    return UpgradeOptimizer()
 
 st.title("R&D Opportunity Explorer (Enhanced)")
 
@@ -21,67 +27,25 @@ ai_appetite = st.selectbox("GenAI Appetite", ["Low", "Medium", "High"])
 ai_maturity = st.selectbox("GenAI Maturity", ["Low", "Medium", "High"])
 ai_adoption = st.selectbox("GenAI Adoption", ["Low", "Medium", "High"])
 
-# --- Scoring Maps ---
-level_scores = {"Low": 3, "Medium": 2, "High": 1}
-inverse_scores = {"Outdated": 3, "Developing": 2, "Advanced": 1}
-platform_scores = {"On-Prem": 3, "Hybrid": 2, "Cloud-Native": 1}
-product_scores = {"Basic": 3, "Intermediate": 2, "Comprehensive": 1}
-size_scores = {"Local": 1, "Regional": 2, "Global": 3}
-ta_scores = {"Niche": 1, "Moderate": 2, "Broad": 3}
-pipeline_scores = {"Simple": 1, "Moderate": 2, "Complex": 3}
-
-# --- Weights per category (customizable later) ---
-weights = {
-    "Tech Strategy": 0.10,
-    "Data Platforms": 0.08,
-    "Data Products": 0.06,
-    "AI Opportunity": 0.10,
-    "Client Size": 0.04,
-    "TA Breadth": 0.04,
-    "Pipeline Complexity": 0.04,
-    "Digital Maturity": 0.04,
-}
-
-# --- Scoring Logic ---
-scores = {
-    "Tech Strategy": inverse_scores[tech_maturity],
-    "Data Platforms": platform_scores[data_platform],
-    "Data Products": product_scores[data_products],
-    "AI Appetite": level_scores[ai_appetite],
-    "AI Maturity": level_scores[ai_maturity],
-    "AI Adoption": level_scores[ai_adoption],
-    "Client Size": size_scores[footprint],
-    "TA Breadth": ta_scores[ta_focus],
-    "Pipeline Complexity": pipeline_scores[pipeline],
-    "Digital Maturity": level_scores[digital_maturity],
-}
-
-# Composite AI score and mapped category
-ai_total = scores["AI Appetite"] + scores["AI Maturity"] + scores["AI Adoption"]
-if ai_total >= 7:
-    ai_category = "High Opportunity"
-    ai_weight = weights["AI Opportunity"]
-elif ai_total >= 5:
-    ai_category = "Moderate Opportunity"
-    ai_weight = weights["AI Opportunity"] * 0.6
-else:
-    ai_category = "Low Opportunity"
-    ai_weight = weights["AI Opportunity"] * 0.3
-
-# --- Revenue Opportunity Calculation ---
-components = {
-    "Tech Strategy": weights["Tech Strategy"] * scores["Tech Strategy"] / 3,
-    "Data Platforms": weights["Data Platforms"] * scores["Data Platforms"] / 3,
-    "Data Products": weights["Data Products"] * scores["Data Products"] / 3,
-    "AI/GenAI": ai_weight,
-    "Client Size": weights["Client Size"] * scores["Client Size"] / 3,
-    "TA Breadth": weights["TA Breadth"] * scores["TA Breadth"] / 3,
-    "Pipeline Complexity": weights["Pipeline Complexity"] * scores["Pipeline Complexity"] / 3,
-    "Digital Maturity": weights["Digital Maturity"] * scores["Digital Maturity"] / 3,
+# --- Scoring (rules live in scoring_rules.json) ---
+profile = {
+    "Client": client_name,
+    "R&D Spend": rd_spend,
+    "Footprint": footprint,
+    "TA Focus": ta_focus,
+    "Pipeline": pipeline,
+    "Digital Maturity": digital_maturity,
+    "Tech Maturity": tech_maturity,
+    "Data Platform": data_platform,
+    "Data Products": data_products,
+    "AI Appetite": ai_appetite,
+    "AI Maturity": ai_maturity,
+    "AI Adoption": ai_adoption,
 }
-
-total_opportunity_pct = sum(components.values())
-total_revenue = round(rd_spend * total_opportunity_pct, -3)
+row, ai = score_record(profile)
+components = {name: row[name] for name in COMPONENTS}
+ai_category = AI_CATEGORIES[ai]
+total_revenue = row["Estimated Revenue Opportunity"]
 
 # --- Display ---
 if st.button("Calculate Opportunity"):
@@ -95,9 +59,26 @@ if st.button("Calculate Opportunity"):
     st.write("### Breakdown by Area")
     st.dataframe(df.style.format({"Weight": "{:.2%}", "Revenue Contribution": "${:,.0f}"}))
 
-    if total_opportunity_pct > 0.66:
+    if row["Priority Tier"] == "HIGH":
         st.success("Priority Tier: HIGH")
-    elif total_opportunity_pct > 0.4:
+    elif row["Priority Tier"] == "MEDIUM":
         st.warning("Priority Tier: MEDIUM")
     else:
         st.info("Priority Tier: LOW")
+
+# --- Upgrade paths ---
+st.header("Upgrade Paths")
+max_steps = st.slider("Maximum factor changes", min_value=1, max_value=10, value=3)
+optimizer = get_optimizer()
+path = optimizer.best_path(profile, max_steps)
+if path["gain"] > 0:
+    st.write(f"Best path: **{path['steps']}** change(s) raise the opportunity from ${path['current']:,.0f} "
+             f"to **${path['best']:,.0f}** (+${path['gain']:,.0f}, ${path['gain_per_step']:,.0f} per step).")
+    st.dataframe(pd.DataFrame(path["path"]).style.format(
+        {"Estimated Revenue Opportunity": "${:,.0f}", "Revenue Delta": "${:+,.0f}"}))
+else:
+    st.info("No change of up to this many factors raises the opportunity.")
+
+st.subheader("Single-Step Changes")
+st.dataframe(pd.DataFrame(optimizer.moves(profile)).style.format(
+    {"Estimated Revenue Opportunity": "${:,.0f}", "Revenue Delta": "${:+,.0f}"}))
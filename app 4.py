@@ -1,10 +1,34 @@
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import altair as alt
+import profiling
+import sessions
+from rollups import MaturityGrids
+from scoring import get_scorer
 
 st.set_page_config(page_title="R&D Opportunity Explorer", layout="wide")
 
+# Admin-armed cProfile/tracemalloc capture of this run (see profiling.py)
+def profile_meta():
+    ctx = get_script_run_ctx()
+    return {"session_id": ctx.session_id if ctx else None,
+            "portfolio_size": len(st.session_state.get("clients", [])), "app": "app 4.py"}
+
+profiling.begin(st.session_state, **profile_meta())
+is_admin = profiling.is_admin(st.query_params)
+
+# Clients live only in this session here, so an idle session's list is
+# spilled to disk and reloaded on its next run (see sessions.py)
+@st.cache_resource
+def get_sessions():
+    return sessions.SessionRegistry()
+
+ctx = get_script_run_ctx()
+if ctx is not None:
+    get_sessions().touch(ctx.session_id, ctx.session_state)
+
 # Deloitte Branding
 st.markdown(
     "<h1 style='color:#1A4D8F;'>Deloitte | R&D Opportunity Explorer</h1>",
@@ -15,6 +39,8 @@ st.markdown("Use this tool to assess and compare revenue opportunities across mu
 # --- Input Section ---
 st.sidebar.image("https://upload.wikimedia.org/wikipedia/commons/thumb/6/6e/Deloitte.svg/2560px-Deloitte.svg.png", width=150)
 st.sidebar.header("Add Client Profiles")
+if is_admin:
+    st.sidebar.toggle("Profile next run", key=profiling.ARMED_KEY, on_change=profiling.arm, args=(st.session_state,))
 
 with st.sidebar.form(key="client_form"):
     client_name = st.text_input("Client Name")
@@ -49,99 +75,30 @@ with st.sidebar.form(key="client_form"):
         })
         st.success(f"{client_name} added successfully!")
 
-# Scoring maps
-level_scores = {"Low": 3, "Medium": 2, "High": 1}
-inverse_scores = {"Outdated": 3, "Developing": 2, "Advanced": 1}
-platform_scores = {"On-Prem": 3, "Hybrid": 2, "Cloud-Native": 1}
-product_scores = {"Basic": 3, "Intermediate": 2, "Comprehensive": 1}
-size_scores = {"Local": 1, "Regional": 2, "Global": 3}
-ta_scores = {"Niche": 1, "Moderate": 2, "Broad": 3}
-pipeline_scores = {"Simple": 1, "Moderate": 2, "Complex": 3}
-
-# Weights
-weights = {
-    "Tech Strategy": 0.10,
-    "Data Platforms": 0.08,
-    "Data Products": 0.06,
-    "AI Opportunity": 0.10,
-    "Client Size": 0.04,
-    "TA Breadth": 0.04,
-    "Pipeline Complexity": 0.04,
-    "Digital Maturity": 0.04,
+# Same rules as the other dashboards, with the detailed roadmap/action texts
+scorer = get_scorer("detailed")
+
+MATURITY_LABELS = {
+    "Tech Maturity": "Clinical Tech Maturity",
+    "Data Platform": "Data Platform Maturity",
+    "Data Products": "Data Products Capability",
+    "Digital Maturity": "Digital Maturity",
+    "AI Appetite": "GenAI Appetite",
+    "AI Maturity": "GenAI Maturity",
+    "AI Adoption": "GenAI Adoption",
 }
 
 if "clients" in st.session_state and st.session_state["clients"]:
-    df_input = pd.DataFrame(st.session_state["clients"])
-    results = []
-    maturity_data = []
-
-    for _, row in df_input.iterrows():
-        scores = {
-            "Tech Strategy": inverse_scores[row["Tech Maturity"]],
-            "Data Platforms": platform_scores[row["Data Platform"]],
-            "Data Products": product_scores[row["Data Products"]],
-            "AI Appetite": level_scores[row["AI Appetite"]],
-            "AI Maturity": level_scores[row["AI Maturity"]],
-            "AI Adoption": level_scores[row["AI Adoption"]],
-            "Client Size": size_scores[row["Footprint"]],
-            "TA Breadth": ta_scores[row["TA Focus"]],
-            "Pipeline Complexity": pipeline_scores[row["Pipeline"]],
-            "Digital Maturity": level_scores[row["Digital Maturity"]],
-        }
-
-        ai_total = scores["AI Appetite"] + scores["AI Maturity"] + scores["AI Adoption"]
-        if ai_total >= 7:
-            ai_weight = weights["AI Opportunity"]
-            ai_category = "High Opportunity"
-            ai_roadmap = "Ready for scaled AI/GenAI deployment"
-            action_step = "Implement enterprise AI/GenAI platform with use-case integration"
-        elif ai_total >= 5:
-            ai_weight = weights["AI Opportunity"] * 0.6
-            ai_category = "Moderate Opportunity"
-            ai_roadmap = "Begin pilots, strengthen AI/GenAI infrastructure"
-            action_step = "Conduct AI pilot for clinical or regulatory use case"
-        else:
-            ai_weight = weights["AI Opportunity"] * 0.3
-            ai_category = "Low Opportunity"
-            ai_roadmap = "Focus on AI/GenAI awareness and data readiness"
-            action_step = "Educate stakeholders and assess data architecture for AI readiness"
-
-        components = {
-            "Tech Strategy": weights["Tech Strategy"] * scores["Tech Strategy"] / 3,
-            "Data Platforms": weights["Data Platforms"] * scores["Data Platforms"] / 3,
-            "Data Products": weights["Data Products"] * scores["Data Products"] / 3,
-            "AI/GenAI": ai_weight,
-            "Client Size": weights["Client Size"] * scores["Client Size"] / 3,
-            "TA Breadth": weights["TA Breadth"] * scores["TA Breadth"] / 3,
-            "Pipeline Complexity": weights["Pipeline Complexity"] * scores["Pipeline Complexity"] / 3,
-            "Digital Maturity": weights["Digital Maturity"] * scores["Digital Maturity"] / 3,
-        }
-
-        total_score = sum(components.values())
-        revenue = round(row["R&D Spend"] * total_score, -3)
-
-        results.append({
-            "Client": row["Client"],
-            "R&D Spend": row["R&D Spend"],
-            "AI/GenAI Category": ai_category,
-            "Estimated Revenue Opportunity": revenue,
-            "Priority Tier": "HIGH" if total_score > 0.66 else "MEDIUM" if total_score > 0.4 else "LOW",
-            **components
-        })
+    df_input = pd.DataFrame(st.session_state["clients"], columns=scorer.input_columns)
+    scored = scorer.score_arrays(df_input)
+    df_results, _ = scorer.result_frames(df_input["Client"].to_numpy(), scored)
+    df_results.insert(1, "R&D Spend", df_input["R&D Spend"])
+    df_results.insert(2, "AI/GenAI Category", scorer.band_labels(scored, "category"))
 
-        maturity_data.append({
-            "Client": row["Client"],
-            "Digital Maturity": row["Digital Maturity"],
-            "Tech Maturity": row["Tech Maturity"],
-            "Data Platform": row["Data Platform"],
-            "Data Products": row["Data Products"],
-            "AI Readiness": ai_category,
-            "AI Roadmap": ai_roadmap,
-            "Recommended Action": action_step
-        })
-
-    df_results = pd.DataFrame(results)
-    df_maturity = pd.DataFrame(maturity_data)
+    df_maturity = df_input[["Client", "Digital Maturity", "Tech Maturity", "Data Platform", "Data Products"]].copy()
+    df_maturity["AI Readiness"] = scorer.band_labels(scored, "category")
+    df_maturity["AI Roadmap"] = scorer.band_labels(scored, "roadmap")
+    df_maturity["Recommended Action"] = scorer.band_labels(scored, "action")
 
     st.header("Client Opportunity Summary")
     st.dataframe(df_results.style.format({"Estimated Revenue Opportunity": "${:,.0f}"}))
@@ -170,7 +127,49 @@ if "clients" in st.session_state and st.session_state["clients"]:
     st.altair_chart(stacked, use_container_width=True)
 
     st.header("Maturity Heatmap and Roadmap Tracker")
+    # Binned from the level codes already scored above; the session's grids
+    # only fold in clients added since the last run
+    grids = st.session_state.get("maturity_grids")
+    if grids is None or grids.count > len(df_input):
+        grids = st.session_state["maturity_grids"] = MaturityGrids()
+    if grids.count < len(df_input):
+        new_codes = {col: codes[grids.count:] for col, codes in scored["codes"].items()}
+        grids.add_scored(new_codes, scored["revenue"][grids.count:])
+
+    pair_labels = {f"{MATURITY_LABELS[row]} × {MATURITY_LABELS[col]}": (row, col) for row, col in grids.pairs}
+    col1, col2 = st.columns(2)
+    row, col = pair_labels[col1.selectbox("Dimensions", list(pair_labels))]
+    measure = col2.radio("Measure", ["Clients", "Revenue Opportunity"], horizontal=True)
+    grid = grids.grid((row, col))
+    base = alt.Chart(grid).encode(
+        x=alt.X(f"{col}:N", sort=scorer.levels[col], title=MATURITY_LABELS[col]),
+        y=alt.Y(f"{row}:N", sort=scorer.levels[row], title=MATURITY_LABELS[row]),
+    )
+    heatmap = base.mark_rect().encode(
+        color=alt.Color(f"{measure}:Q", scale=alt.Scale(scheme="blues")),
+        tooltip=[row, col, "Clients", alt.Tooltip("Revenue Opportunity:Q", format="$,.0f")],
+    )
+    labels = base.mark_text().encode(text=alt.Text("Clients:Q", format=",.0f"))
+    st.altair_chart((heatmap + labels).properties(width=500, height=350))
+
     st.dataframe(df_maturity)
 
 else:
     st.info("Add at least one client from the sidebar to begin.")
+
+if is_admin:
+    with st.expander("Profiling Captures"):
+        records = profiling.captures()
+        labels = {f"{r['id']} · {r['app']} · {r['portfolio_size']:,} clients · {r['seconds'] * 1000:,.0f} ms"
+                  + (" (partial)" if r["partial"] else ""): r for r in records}
+        if labels:
+            record = labels[st.selectbox("Capture", list(labels))]
+            st.caption(f"Session {record['session_id']} · peak traced memory {record['peak_traced_bytes'] / 2 ** 20:,.1f} MiB")
+            st.dataframe(pd.DataFrame(record["functions"]))
+            st.dataframe(pd.DataFrame(record["allocations"]))
+            with open(profiling.profile_path(record["id"]), "rb") as f:
+                st.download_button("Download .prof", f.read(), file_name=f"{record['id']}.prof")
+        else:
+            st.caption("Turn on 'Profile next run' in the sidebar, then interact with the dashboard.")
+
+profiling.finish(st.session_state, **profile_meta())
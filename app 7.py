@@ -2,9 +2,7 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import openai
-import json
-import os
+from client_store import ClientStore
 
 # ------------------ SETUP ------------------
 st.set_page_config(page_title="R&D Opportunity Explorer", layout="wide")
@@ -12,17 +10,18 @@ DATA_FILE = "client_data.json"
 st.markdown("<style>body { font-family: 'Segoe UI'; }</style>", unsafe_allow_html=True)
 
 # ------------------ FUNCTIONS ------------------
+@st.cache_resource
+def get_store():
+    return ClientStore(DATA_FILE)
+
+store = get_store()
+
 def load_clients():
-    if "clients" not in st.session_state:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, "r") as f:
-                st.session_state.clients = json.load(f)
-        else:
-            st.session_state.clients = []
+    # Re-read only when another session has committed a newer version
+    st.session_state.clients_version, st.session_state.clients = store.read()
 
-def save_clients():
-    with open(DATA_FILE, "w") as f:
-        json.dump(st.session_state.clients, f)
+def add_client(record):
+    st.session_state.clients_version, st.session_state.clients = store.add(record)
 
 load_clients()
 
@@ -55,7 +54,7 @@ with st.sidebar.form("client_form"):
 
     submitted = st.form_submit_button("Add Client")
     if submitted and client_name:
-        st.session_state.clients.append({
+        add_client({
             "Client": client_name,
             "R&D Spend": rd_spend,
             "Footprint": footprint,
@@ -69,15 +68,13 @@ with st.sidebar.form("client_form"):
             "AI Maturity": ai_maturity,
             "AI Adoption": ai_adoption
         })
-        save_clients()
         st.success(f"{client_name} added successfully!")
 
 st.sidebar.markdown("---")
 if st.sidebar.button("Reset All Client Data"):
+    st.session_state.clients_version = store.reset(reason="sidebar reset")
     st.session_state.clients = []
-    if os.path.exists(DATA_FILE):
-        os.remove(DATA_FILE)
-    st.experimental_rerun()
+    st.rerun()
 
 # ------------------ MAIN DASHBOARD ------------------
 if st.session_state.clients:
@@ -1,40 +1,145 @@
 
 import streamlit as st
-import pandas as pd
-import altair as alt
-import json
-import os
+import jobs
+import portfolio
+import profiling
+import sessions
 
 st.set_page_config(page_title="R&D Opportunity Explorer", layout="wide")
 
-# File persistence setup
+# Admin-armed cProfile/tracemalloc capture of this run (see profiling.py)
+def script_ctx():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    return get_script_run_ctx()
+
+def session_id():
+    ctx = script_ctx()
+    return ctx.session_id if ctx else None
+
+def profile_meta():
+    return {"session_id": session_id(), "portfolio_size": len(st.session_state.get("clients", [])), "app": "app.py"}
+
+profiling.begin(st.session_state, **profile_meta())
+
+# Per-session memory accounting; idle sessions give up their large state
+@st.cache_resource
+def get_sessions():
+    return sessions.SessionRegistry()
+
+if script_ctx() is not None:
+    # clients is re-read from the shared store on every run, so it is dropped rather than spilled
+    get_sessions().touch(session_id(), script_ctx().session_state, reloadable=["clients"])
+
+def restore_session():
+    # Fragment reruns skip the top of the script; an evicted session reruns it in full
+    if "clients" not in st.session_state:
+        st.rerun()
+
+# Imports and exports run as background jobs (see jobs.py); the page polls
+# their progress instead of waiting on them
+@st.cache_resource
+def get_jobs():
+    return jobs.JobQueue()
+
+# File persistence setup: one shard per engagement team (see partitions.py);
+# client_data.json is the Default team
 DATA_FILE = "client_data.json"
+HISTORY_DIR = "client_history"
+
+@st.cache_resource
+def get_partitions():
+    from partitions import PartitionSet
+    return PartitionSet(default_file=DATA_FILE)
+
+def create_team():
+    from partitions import DuplicatePartition
+    name = st.session_state.new_team.strip()
+    if not name:
+        return
+    try:
+        get_partitions().create(name)
+        st.session_state.team = name
+        st.session_state.new_team = ""
+    except DuplicatePartition as e:
+        st.session_state.team_error = str(e)
+
+# Sessions load and score only the selected team's shard
+teams = get_partitions()
+st.sidebar.selectbox("Engagement Team", teams.names(), key="team")
+with st.sidebar.expander("New Team"):
+    st.text_input("Team Name", key="new_team")
+    st.button("Create Team", on_click=create_team)
+    if "team_error" in st.session_state:
+        st.error(st.session_state.pop("team_error"))
+team = st.session_state.team
+data_file = teams.path(team)
+
+# Heavier modules (pandas, altair, pyarrow) are imported inside the sections
+# that use them, so a run with no clients only loads Streamlit.
+store = portfolio.get_store(data_file)
+
+@st.cache_resource
+def get_snapshots(history_dir):
+    from snapshots import SnapshotStore
+    return SnapshotStore(history_dir)
+
+def team_snapshots():
+    from partitions import DEFAULT_PARTITION, slug
+    if team == DEFAULT_PARTITION:
+        return get_snapshots(HISTORY_DIR)
+    return get_snapshots(f"{HISTORY_DIR}/{slug(team)}")
 
 def load_clients():
-    if "clients" not in st.session_state:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, "r") as f:
-                st.session_state.clients = json.load(f)
-        else:
-            st.session_state.clients = []
+    # Re-read only when another session has committed a newer version
+    st.session_state.clients_version, st.session_state.clients = store.read()
+
+def record_change(label, write):
+    # Apply a keyed write, then snapshot the clients changed since the last
+    # snapshot and refresh the team summary. Writes made elsewhere without a
+    # snapshot (app 10) leave changes unknown, and take() diffs in full.
+    version, clients = write()
+    st.session_state.clients_version, st.session_state.clients = version, clients
+    snapshots = team_snapshots()
+    last = snapshots.last_version()
+    changes = store.changes_between(last, version) if last is not None else None
+    snapshots.take(clients, label=label, version=version, changes=changes)
+    teams.refresh(team, version, clients)
+    change = store.changes_between(version - 1, version)
+    return change[0] if change else None
 
-def save_clients():
-    with open(DATA_FILE, "w") as f:
-        json.dump(st.session_state.clients, f)
+def save_client(record):
+    # Re-assessing a client replaces its record instead of adding a duplicate
+    change = record_change("upsert", lambda: store.upsert(record))
+    return change is not None and change.old is not None
 
 load_clients()
 
 # --- Admin Reset Button ---
 st.sidebar.markdown("---")
 if st.sidebar.button("Reset All Client Data"):
-    st.session_state.clients = []
-    if os.path.exists(DATA_FILE):
-        os.remove(DATA_FILE)
-    st.experimental_rerun()
+    record_change("reset", lambda: (store.reset(reason="sidebar reset"), []))
+    st.rerun()
 
 # Branding
 st.markdown("<h1 style='color:#1A4D8F;'>Deloitte | R&D Opportunity Explorer</h1>", unsafe_allow_html=True)
 
+# Stored records that failed validation at load (see validation.py)
+def quarantine_notice():
+    entries = store.quarantined()
+    if not entries:
+        return
+    import pandas as pd
+    st.warning(f"{len(entries):,} stored client records failed validation and were set aside "
+               f"in {store.quarantine_path}.")
+    with st.expander("Quarantined Records"):
+        st.dataframe(pd.DataFrame([{
+            "Client": entry["record"].get("Client") if isinstance(entry["record"], dict) else None,
+            "Reasons": "; ".join(entry["reasons"]),
+            "Version": entry["version"],
+        } for entry in entries]))
+
+quarantine_notice()
+
 # Sidebar form
 st.sidebar.image("https://upload.wikimedia.org/wikipedia/commons/thumb/6/6e/Deloitte.svg/2560px-Deloitte.svg.png", width=150)
 st.sidebar.header("Add Client Profile")
@@ -53,9 +158,9 @@ with st.sidebar.form("client_form"):
     ai_maturity = st.selectbox("GenAI Maturity", ["Low", "Medium", "High"])
     ai_adoption = st.selectbox("GenAI Adoption", ["Low", "Medium", "High"])
 
-    if st.form_submit_button("Add Client"):
-        st.session_state.clients.append({
-            "Client": client_name,
+    if st.form_submit_button("Add Client") and client_name.strip():
+        updated = save_client({
+            "Client": client_name.strip(),
             "R&D Spend": rd_spend,
             "Footprint": footprint,
             "TA Focus": ta_focus,
@@ -68,90 +173,115 @@ with st.sidebar.form("client_form"):
             "AI Maturity": ai_maturity,
             "AI Adoption": ai_adoption
         })
-        save_clients()
-        st.success(f"{client_name} added successfully!")
-
-# Scoring maps
-score_map = {"Low": 3, "Medium": 2, "High": 1}
-inv_map = {"Outdated": 3, "Developing": 2, "Advanced": 1}
-platform_map = {"On-Prem": 3, "Hybrid": 2, "Cloud-Native": 1}
-product_map = {"Basic": 3, "Intermediate": 2, "Comprehensive": 1}
-size_map = {"Local": 1, "Regional": 2, "Global": 3}
-ta_map = {"Niche": 1, "Moderate": 2, "Broad": 3}
-pipeline_map = {"Simple": 1, "Moderate": 2, "Complex": 3}
-
-weights = {
-    "Tech Strategy": 0.10,
-    "Data Platforms": 0.08,
-    "Data Products": 0.06,
-    "AI Opportunity": 0.10,
-    "Client Size": 0.04,
-    "TA Breadth": 0.04,
-    "Pipeline Complexity": 0.04,
-    "Digital Maturity": 0.04,
-}
+        st.success(f"{client_name} {'updated' if updated else 'added'} successfully!")
 
-if st.session_state.clients:
-    df_input = pd.DataFrame(st.session_state.clients)
-    results = []
-    maturity = []
-
-    for _, row in df_input.iterrows():
-        scores = {
-            "Tech Strategy": inv_map[row["Tech Maturity"]],
-            "Data Platforms": platform_map[row["Data Platform"]],
-            "Data Products": product_map[row["Data Products"]],
-            "AI Appetite": score_map[row["AI Appetite"]],
-            "AI Maturity": score_map[row["AI Maturity"]],
-            "AI Adoption": score_map[row["AI Adoption"]],
-            "Client Size": size_map[row["Footprint"]],
-            "TA Breadth": ta_map[row["TA Focus"]],
-            "Pipeline Complexity": pipeline_map[row["Pipeline"]],
-            "Digital Maturity": score_map[row["Digital Maturity"]],
-        }
+# Sidebar bulk import, run as a job
+def import_job(job, data, filename, store, snapshots, team):
+    from bulk_import import read_upload
+    job.progress(0, message="Checking the file")
+    records = read_upload(data, filename)
+    job.progress(0, len(records), message=f"Importing {len(records):,} clients")
+    version, clients = store.upsert_many(records, progress=job.progress)
+    snapshots.take(clients, label="import", version=version)
+    teams.refresh(team, version, clients)
+    job.message = f"{len(records):,} clients imported"
+    return version
 
-        ai_total = scores["AI Appetite"] + scores["AI Maturity"] + scores["AI Adoption"]
-        if ai_total >= 7:
-            ai_weight = weights["AI Opportunity"]
-            ai_category = "High Opportunity"
-            ai_roadmap = "Implement enterprise AI/GenAI platform"
-        elif ai_total >= 5:
-            ai_weight = weights["AI Opportunity"] * 0.6
-            ai_category = "Moderate Opportunity"
-            ai_roadmap = "Run AI/GenAI pilot with scalable infra"
-        else:
-            ai_weight = weights["AI Opportunity"] * 0.3
-            ai_category = "Low Opportunity"
-            ai_roadmap = "Build awareness and assess AI readiness"
-
-        components = {
-            "Tech Strategy": weights["Tech Strategy"] * scores["Tech Strategy"] / 3,
-            "Data Platforms": weights["Data Platforms"] * scores["Data Platforms"] / 3,
-            "Data Products": weights["Data Products"] * scores["Data Products"] / 3,
-            "AI/GenAI": ai_weight,
-            "Client Size": weights["Client Size"] * scores["Client Size"] / 3,
-            "TA Breadth": weights["TA Breadth"] * scores["TA Breadth"] / 3,
-            "Pipeline Complexity": weights["Pipeline Complexity"] * scores["Pipeline Complexity"] / 3,
-            "Digital Maturity": weights["Digital Maturity"] * scores["Digital Maturity"] / 3,
+with st.sidebar.expander("Bulk Import"):
+    upload = st.file_uploader("Client profiles (CSV or JSON)", type=["csv", "json"])
+    if st.button("Import in Background", disabled=upload is None):
+        get_jobs().submit(f"Import {upload.name}", import_job, upload.getvalue(), upload.name,
+                          store, team_snapshots(), team, owner=team, kind="import")
+
+# Sidebar edit/remove, keyed by client name
+PROFILE_FIELDS = [
+    ("Footprint", "Global Footprint"),
+    ("TA Focus", "Therapeutic Area Focus"),
+    ("Pipeline", "Pipeline Complexity"),
+    ("Digital Maturity", "Digital Maturity"),
+    ("Tech Maturity", "Clinical Tech Maturity"),
+    ("Data Platform", "Data Platform Maturity"),
+    ("Data Products", "Data Products Capability"),
+    ("AI Appetite", "GenAI Appetite"),
+    ("AI Maturity", "GenAI Maturity"),
+    ("AI Adoption", "GenAI Adoption"),
+]
+
+def manage_clients():
+    from client_store import DuplicateClient, UnknownClient, client_key
+    from scoring import LEVELS
+
+    st.sidebar.markdown("---")
+    st.sidebar.header("Edit or Remove Client")
+    selected = st.sidebar.selectbox("Client", [c["Client"] for c in st.session_state.clients])
+    current = store.get(selected)
+    if current is None:
+        return
+    # Widget keys carry the selected client so switching clients reloads the form
+    prefix = f"edit_{client_key(selected)}"
+    with st.sidebar.form("edit_client_form"):
+        record = {
+            "Client": st.text_input("Client Name", value=current["Client"], key=f"{prefix}_name").strip(),
+            "R&D Spend": st.number_input("R&D Spend (USD)", min_value=0, step=1000000,
+                                         value=int(current["R&D Spend"]), key=f"{prefix}_spend"),
         }
+        for column, label in PROFILE_FIELDS:
+            record[column] = st.selectbox(label, LEVELS[column], index=LEVELS[column].index(current[column]),
+                                          key=f"{prefix}_{column}")
+        save = st.form_submit_button("Save Changes")
+    delete = st.sidebar.button("Delete Client")
 
-        total_score = sum(components.values())
-        revenue = round(row["R&D Spend"] * total_score, -3)
+    try:
+        if save and record["Client"]:
+            record_change("edit", lambda: store.edit(selected, record))
+            st.rerun()
+        if delete:
+            record_change("delete", lambda: store.delete(selected))
+            st.rerun()
+    except (DuplicateClient, UnknownClient) as e:
+        st.sidebar.error(str(e))
 
-        results.append({
-            "Client": row["Client"],
-            "Estimated Revenue Opportunity": revenue,
-            "Priority Tier": "HIGH" if total_score > 0.66 else "MEDIUM" if total_score > 0.4 else "LOW",
-            **components
-        })
+if st.session_state.clients:
+    manage_clients()
 
-        maturity.append({
-            "Client": row["Client"],
-            "AI Roadmap": ai_roadmap
-        })
+# Priority Tier by the spec's fixed cut-offs, or by portfolio percentiles of a metric
+TIER_MODES = {
+    "Fixed thresholds": None,
+    "Percentile of Total Score": "Total Score",
+    "Percentile of Revenue Opportunity": "Estimated Revenue Opportunity",
+}
+
+def tier_metric():
+    # The metric the selected tier mode ranks by; None for the fixed thresholds
+    return TIER_MODES[st.session_state.get("tier_mode", "Fixed thresholds")]
+
+def tier_basis():
+    metric = tier_metric()
+    return "fixed score thresholds" if metric is None else f"portfolio percentiles of {metric}"
+
+def score_portfolio():
+    # Scored once per portfolio version in the process-wide cache warm_up() fills
+    metric = tier_metric()
+    df_results, df_maturity, _ = portfolio.tiered(data_file, st.session_state.clients_version,
+                                                  st.session_state.clients, metric)
+    return df_results, df_maturity
+
+def tier_mode_section():
+    from scoring import TIERS
+
+    st.radio("Priority Tier", list(TIER_MODES), horizontal=True, key="tier_mode")
+    metric = tier_metric()
+    if metric is not None:
+        cutoffs = portfolio.tier_cutoffs(data_file, st.session_state.clients_version, st.session_state.clients, metric)
+        fmt = "{:.3f}" if metric == "Total Score" else "${:,.0f}"
+        st.caption(" · ".join(f"{tier} ≥ {fmt.format(cutoff)}" for tier, cutoff in zip(TIERS, cutoffs) if cutoff is not None)
+                   + f" ({metric}, portfolio percentiles)")
 
-    df_results = pd.DataFrame(results)
-    df_maturity = pd.DataFrame(maturity)
+# --- Dashboard sections ---
+# Sections with widgets are fragments: interacting with one reruns only that
+# function against the cached scores instead of the whole script.
+def results_section(df_results):
+    import altair as alt
 
     st.header("Opportunity Summary")
     st.dataframe(df_results)
@@ -165,12 +295,164 @@ if st.session_state.clients:
     ).properties(width=900)
     st.altair_chart(chart)
 
-    st.subheader("AI Roadmap")
-    st.dataframe(df_maturity)
+@st.fragment
+def search_section():
+    restore_session()
+    from scoring import AI_CATEGORIES, AI_ROADMAPS, COMPONENTS, metric_values, score_record, tiers_for
+
+    st.subheader("Find a Client")
+    query = st.text_input("Search clients by name", placeholder="Start typing a client name")
+    if not query:
+        return
+    index = portfolio.name_index(data_file, st.session_state.clients_version, st.session_state.clients)
+    matches = [name for name, _ in index.search(query)]
+    if not matches:
+        st.warning("No matching clients.")
+        return
+    selected = st.radio("Matches", matches, horizontal=True)
+    record = store.get(selected)
+    if record is None:
+        return
+    row, ai = score_record(record)
+    # Same tiering as the results table: the portfolio percentiles when those are selected
+    metric = tier_metric()
+    if metric is not None:
+        cutoffs = portfolio.tier_cutoffs(data_file, st.session_state.clients_version, st.session_state.clients, metric)
+        row["Priority Tier"] = tiers_for([metric_values(row, metric)], cutoffs)[0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Estimated Revenue Opportunity", f"${row['Estimated Revenue Opportunity']:,.0f}")
+    col2.metric("Priority Tier", row["Priority Tier"])
+    col3.metric("AI/GenAI Category", AI_CATEGORIES[ai])
+    st.dataframe({"Component": COMPONENTS, "Weight": [row[name] for name in COMPONENTS]})
+    st.markdown(f"**AI Roadmap:** {AI_ROADMAPS[ai]}")
+
+@st.fragment
+def rollup_section():
+    restore_session()
+    from rollups import DIMENSIONS
+
+    st.subheader("Portfolio Rollups")
+    rollup_dims = st.multiselect("Group by", list(DIMENSIONS), default=["Priority Tier"])
+    cube = portfolio.rollup_cube(data_file, st.session_state.clients_version, st.session_state.clients, tier_metric())
+    st.dataframe(cube.rollup(rollup_dims))
+    st.caption(f"Priority Tier by {tier_basis()}.")
+
+@st.fragment
+def history_section(client_names):
+    restore_session()
+    import altair as alt
+
+    st.subheader("Score History")
+    history_clients = st.multiselect("Clients to trend", client_names)
+    history_metric = st.selectbox("Metric", ["Estimated Revenue Opportunity", "Total Score"])
+    if history_clients:
+        trend = team_snapshots().trend([history_metric, "Priority Tier"], clients=history_clients)
+        history_chart = alt.Chart(trend).mark_line(point=True).encode(
+            x=alt.X("Timestamp:T", title="Snapshot"),
+            y=alt.Y(f"{history_metric}:Q"),
+            color="Client:N",
+            tooltip=["Client", history_metric, "Priority Tier", "Timestamp"]
+        ).properties(width=900)
+        st.altair_chart(history_chart)
+
+@st.fragment
+def upgrades_section():
+    restore_session()
+    st.subheader("Upgrade Potential")
+    max_steps = st.slider("Maximum factor changes per client", min_value=1, max_value=10, value=3)
+    ranked = portfolio.upgrades(data_file, st.session_state.clients_version, st.session_state.clients, max_steps)
+    st.dataframe(ranked.head(50).style.format({
+        "Estimated Revenue Opportunity": "${:,.0f}", "Best Revenue": "${:,.0f}",
+        "Revenue Gain": "${:,.0f}", "Gain per Step": "${:,.0f}"}))
+
+@st.fragment
+def allocation_section(df_maturity):
+    import numpy as np
+    from scoring import TIERS
 
+    restore_session()
+    st.subheader("Capacity Allocation")
+    alloc = portfolio.allocator(data_file, st.session_state.clients_version, st.session_state.clients, tier_metric())
+    col1, *weight_cols = st.columns(1 + len(TIERS))
+    capacity = col1.number_input("Consultant capacity (weeks)", min_value=0, step=10,
+                                 value=min(int(alloc.efforts.sum()), 200))
+    tier_weights = {tier: col.number_input(f"{tier} weight", min_value=0.0, value=1.0, step=0.25)
+                    for tier, col in zip(TIERS, weight_cols)}
+    tier_counts = np.bincount(alloc.tiers, minlength=len(TIERS))
+    st.caption(f"Tier weights apply to Priority Tier by {tier_basis()}: "
+               + " · ".join(f"{tier} {count:,} clients" for tier, count in zip(TIERS, tier_counts)))
+    plan = alloc.solve(capacity, tier_weights)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Clients Selected", f"{plan['count']:,}")
+    col2.metric("Effort Used", f"{plan['effort']:,} / {plan['capacity']:,} weeks")
+    col3.metric("Revenue Covered", f"${alloc.revenue[plan['selected']].sum():,.0f}")
+    st.caption(f"Within {plan['gap']:.4%} of the best possible (weighted) value for this capacity.")
+    st.dataframe(alloc.plan_frame(plan, df_maturity).style.format(
+        {"Estimated Revenue Opportunity": "${:,.0f}", "Value per Week": "${:,.0f}"}))
+
+def export_job(job, clients, export_format, metric=None, cutoffs=None):
+    from export import export_bytes
+    return export_bytes(clients, export_format, progress=lambda done, total: job.progress(
+        done, total, f"Scored {done:,} of {total:,} clients"), metric=metric, cutoffs=cutoffs)
+
+@st.fragment
+def export_section():
+    restore_session()
+    from export import EXPORT_FORMATS
+
+    st.subheader("Export Results")
+    export_format = st.selectbox("Export format", list(EXPORT_FORMATS))
+    # Scored and encoded by a background job; the download appears under Background Jobs
+    if st.button(f"Export scored results ({export_format})"):
+        clients = st.session_state.clients
+        extension, mime = EXPORT_FORMATS[export_format]
+        # Exported tiers match the table: the cut-offs of the version being exported
+        metric = tier_metric()
+        cutoffs = portfolio.tier_cutoffs(data_file, st.session_state.clients_version, clients, metric)
+        get_jobs().submit(f"Export {len(clients):,} clients as {export_format}", export_job,
+                          clients, export_format, metric, cutoffs, owner=team, kind="export",
+                          meta={"file_name": f"opportunity_scores.{extension}", "mime": mime})
+        st.rerun(scope="app")
+
+def jobs_section():
+    queue = get_jobs()
+    team_jobs = queue.jobs(owner=team)
+    running = {job.id for job in team_jobs if job.state not in jobs.FINISHED}
+    # A finished job changes the rest of the page (an import adds clients)
+    if st.session_state.get("jobs_running", set()) - running:
+        st.session_state.jobs_running = running
+        st.rerun(scope="app")
+    st.session_state.jobs_running = running
+    if not team_jobs:
+        return
+
+    st.subheader("Background Jobs")
+    for job in team_jobs[:10]:
+        status, action = st.columns([5, 1])
+        if job.state in (jobs.QUEUED, jobs.RUNNING):
+            text = f"{job.label} · {'cancelling' if job.cancel_requested else job.state}"
+            status.progress(job.fraction, text=f"{text} · {job.message}" if job.message else text)
+            action.button("Cancel", key=f"cancel_{job.id}", on_click=queue.cancel, args=(job.id,))
+            continue
+        if job.state == jobs.DONE and job.kind == "export":
+            # Read back from disk only when clicked
+            status.download_button(f"Download · {job.label}", data=lambda job_id=job.id: queue.result(job_id),
+                                   file_name=job.meta["file_name"], mime=job.meta["mime"], key=f"download_{job.id}")
+        elif job.state == jobs.DONE:
+            status.success(f"{job.label} · {job.message}")
+        elif job.state == jobs.FAILED:
+            status.error(f"{job.label} failed: {job.error}")
+        else:
+            status.caption(f"{job.label} · cancelled")
+        action.button("Dismiss", key=f"dismiss_{job.id}", on_click=queue.remove, args=(job.id,))
+
+@st.fragment
+def chat_section():
+    restore_session()
     st.subheader("Chat with Data")
     question = st.text_input("Ask a question (e.g., who has high opportunity?)")
     if question:
+        df_results, _ = score_portfolio()
         if "high" in question.lower():
             st.write(df_results[df_results["Priority Tier"] == "HIGH"])
         elif "low" in question.lower():
@@ -180,5 +462,97 @@ if st.session_state.clients:
         else:
             st.warning("Try asking about high, medium, or low opportunity.")
 
+def teams_section():
+    import pandas as pd
+    from partitions import kpi_row
+    from scoring import TIERS, percentile_cutoffs
+
+    st.subheader("All Engagement Teams")
+    # Served from each team's precomputed summary; no other shard is loaded
+    rows, combined, sketches = teams.overview()
+    overview = pd.DataFrame(rows + [{"Team": "All teams", **kpi_row(combined)}])
+    st.dataframe(overview.style.format({"R&D Spend": "${:,.0f}", "Revenue Opportunity": "${:,.0f}"}))
+    cutoffs = percentile_cutoffs(sketches["Estimated Revenue Opportunity"])
+    if combined.count:
+        st.caption("Firm-wide revenue percentile cut-offs: " + " · ".join(
+            f"{tier} ≥ ${cutoff:,.0f}" for tier, cutoff in zip(TIERS, cutoffs) if cutoff is not None))
+
+def profiling_section():
+    import pandas as pd
+
+    with st.expander("Profiling Captures"):
+        records = profiling.captures()
+        if not records:
+            st.caption("Turn on 'Profile next run' in the sidebar, then interact with the dashboard.")
+            return
+        labels = {f"{r['id']} · {r['app']} · {r['portfolio_size']:,} clients · {r['seconds'] * 1000:,.0f} ms"
+                  + (" (partial)" if r["partial"] else ""): r for r in records}
+        record = labels[st.selectbox("Capture", list(labels))]
+        st.caption(f"Session {record['session_id']} · peak traced memory {record['peak_traced_bytes'] / 2 ** 20:,.1f} MiB")
+        st.markdown("**Top functions (cumulative time)**")
+        st.dataframe(pd.DataFrame(record["functions"]))
+        st.markdown("**Top allocation sites**")
+        st.dataframe(pd.DataFrame(record["allocations"]))
+        with open(profiling.profile_path(record["id"]), "rb") as f:
+            st.download_button("Download .prof", f.read(), file_name=f"{record['id']}.prof")
+
+def session_memory_section():
+    import pandas as pd
+
+    with st.expander("Session Memory"):
+        registry = get_sessions()
+        if st.button("Evict idle sessions now"):
+            released = registry.evict_idle()
+            st.success(f"Released {released / 2 ** 20:,.1f} MiB from idle sessions.")
+        # Walking every session's state is slow, so only on request
+        if st.button("Measure session memory"):
+            rows = registry.usage()
+            st.dataframe(pd.DataFrame([{
+                "Session": row["session"],
+                "Idle (s)": round(row["idle_s"]),
+                "Own MiB": row["own_bytes"] / 2 ** 20,
+                "Shared MiB": row["shared_bytes"] / 2 ** 20,
+                "Largest keys": ", ".join(f"{key} ({size / 2 ** 20:,.1f} MiB)" for key, size in
+                                          sorted(row["keys"].items(), key=lambda item: item[1], reverse=True)[:3]),
+                "Evicted": ", ".join(row["evicted"]),
+            } for row in rows]))
+            st.caption(f"{len(rows)} live sessions")
+        st.caption(f"Idle after {registry.idle_after // 60} min, "
+                   f"values of {registry.large_bytes / 2 ** 20:,.0f} MiB or more are released")
+
+is_admin = profiling.is_admin(st.query_params)
+if is_admin:
+    st.sidebar.toggle("Profile next run", key=profiling.ARMED_KEY, on_change=profiling.arm, args=(st.session_state,))
+
+if len(teams.names()) > 1:
+    teams_section()
+
+# Polls every second while one of the team's jobs is queued or running
+st.fragment(jobs_section, run_every=1 if get_jobs().active(owner=team) else None)()
+
+if st.session_state.clients:
+    tier_mode_section()
+    df_results, df_maturity = score_portfolio()
+
+    search_section()
+    results_section(df_results)
+    rollup_section()
+    history_section(df_results["Client"].unique())
+
+    st.subheader("AI Roadmap")
+    st.dataframe(df_maturity)
+
+    upgrades_section()
+    allocation_section(df_maturity)
+
+    export_section()
+    chat_section()
+
 else:
     st.info("No client data yet. Please add a client.")
+
+if is_admin:
+    session_memory_section()
+    profiling_section()
+
+profiling.finish(st.session_state, **profile_meta())
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmarks for the dashboard.
+#
+#   python bench.py startup [--clients N] [--app app.py]
+#   python bench.py scoring [--clients N]
+#
+# Every measurement that depends on import state runs in a fresh interpreter.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+OPTIONS = {
+    "Footprint": ["Local", "Regional", "Global"],
+    "TA Focus": ["Niche", "Moderate", "Broad"],
+    "Pipeline": ["Simple", "Moderate", "Complex"],
+    "Digital Maturity": ["Low", "Medium", "High"],
+    "Tech Maturity": ["Outdated", "Developing", "Advanced"],
+    "Data Platform": ["On-Prem", "Hybrid", "Cloud-Native"],
+    "Data Products": ["Basic", "Intermediate", "Comprehensive"],
+    "AI Appetite": ["Low", "Medium", "High"],
+    "AI Maturity": ["Low", "Medium", "High"],
+    "AI Adoption": ["Low", "Medium", "High"],
+}
+
+
+def synthetic_clients(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "Client": f"Client {i:06d}",
+            "R&D Spend": rng.randrange(0, 20_000_000_000, 1_000_000),
+            **{field: rng.choice(values) for field, values in OPTIONS.items()},
+        }
+        for i in range(n)
+    ]
+
+
+def _run_python(code, cwd):
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": REPO_DIR},
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+_IMPORT_PROBE = """
+import json, time
+t = time.perf_counter()
+import {module}
+print(json.dumps(time.perf_counter() - t))
+"""
+
+_STARTUP_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import portfolio
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+warm = {warm}
+if warm:
+    portfolio.warm_up("client_data.json")
+t2 = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=600).run()
+t3 = time.perf_counter()
+at.run()
+t4 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "warm_up": t2 - t1, "first_run": t3 - t2,
+                  "second_run": t4 - t3, "errors": [str(e.value) for e in at.exception]}}))
+"""
+
+
+def bench_startup(n_clients, app):
+    app_path = os.path.join(REPO_DIR, app)
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "client_data.json"), "w") as f:
+            json.dump({"version": 1, "clients": synthetic_clients(n_clients)}, f)
+
+        print("Deferred imports (fresh interpreter each):")
+        for module in ["pandas", "altair", "pyarrow", "openai"]:
+            seconds = _run_python(_IMPORT_PROBE.format(module=module), tmp)
+            print(f"  import {module:<8} {seconds * 1000:8.1f} ms")
+
+        print(f"Startup of {app} with {n_clients:,} clients:")
+        for warm in (False, True):
+            r = _run_python(_STARTUP_PROBE.format(warm=warm, app=app_path), tmp)
+            label = "warm-up hook" if warm else "cold"
+            print(f"  {label:<13} warm-up {r['warm_up'] * 1000:8.1f} ms  "
+                  f"first run {r['first_run'] * 1000:8.1f} ms  "
+                  f"next run {r['second_run'] * 1000:8.1f} ms")
+            if r["errors"]:
+                print(f"    errors: {r['errors']}")
+
+
+def bench_scoring(n_clients):
+    sys.path.insert(0, REPO_DIR)
+    from scoring import score_clients
+
+    clients = synthetic_clients(n_clients)
+    start = time.perf_counter()
+    score_clients(clients)
+    seconds = time.perf_counter() - start
+    print(f"Scored {n_clients:,} clients in {seconds:.3f} s ({n_clients / seconds:,.0f} clients/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dashboard benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    startup = sub.add_parser("startup", help="cold vs warmed first script run")
+    startup.add_argument("--clients", type=int, default=10_000)
+    startup.add_argument("--app", default="app.py")
+    scoring = sub.add_parser("scoring", help="vectorized scoring throughput")
+    scoring.add_argument("--clients", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "startup":
+        bench_startup(args.clients, args.app)
+    elif args.command == "scoring":
+        bench_scoring(args.clients)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import io
+import json
+
+import pandas as pd
+
+from scoring import INPUT_COLUMNS
+from validation import check_frame
+
+# Bulk import of client profiles from an uploaded CSV or JSON file.
+#
+# The file needs the same columns as the sidebar form (scoring.INPUT_COLUMNS).
+# Values are checked with the loader's schema check (validation.py) before
+# anything is written, so a bad row rejects the file with the row and the
+# reasons named instead of ending up in quarantine. ClientStore.upsert_many()
+# then applies the whole batch as one write.
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+def read_upload(data, filename):
+    """Client records from the bytes of an uploaded .csv or .json file."""
+    if filename.lower().endswith(".json"):
+        parsed = json.loads(data)
+        if isinstance(parsed, dict):
+            parsed = parsed.get("clients", [])
+        df = pd.DataFrame(parsed)
+    else:
+        df = pd.read_csv(io.BytesIO(data))
+    return validate(df)
+
+
+def validate(df):
+    missing = [col for col in INPUT_COLUMNS if col not in df.columns]
+    if missing:
+        raise InvalidImport(f"missing columns: {', '.join(missing)}")
+    df = df[INPUT_COLUMNS]
+    bad, reasons, _, spend = check_frame(df)
+    if bad.any():
+        row = int(bad.argmax())
+        raise InvalidImport(f"row {row + 1}: {'; '.join(reasons[row])}")
+
+    records = df.assign(Client=df["Client"].astype(str).str.strip(), **{"R&D Spend": spend}).to_dict("records")
+    for record in records:
+        # Stored like the sidebar form stores them: whole dollars as int
+        spend = record["R&D Spend"]
+        record["R&D Spend"] = int(spend) if float(spend).is_integer() else float(spend)
+    return records
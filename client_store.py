@@ -0,0 +1,562 @@
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+# Versioned persistence for client_data.json.
+#
+# The file holds {"version": n, "clients": [...]}. Every write takes a lock
+# file, re-reads the latest state, applies the change and atomically replaces
+# the file (temp file + os.replace), so two sessions adding a client at the
+# same moment both land instead of the later one clobbering the earlier.
+# Legacy files that contain a bare list of clients are read as version 0.
+#
+# Clients are also addressable by key (client_key() of the name): upsert,
+# edit and delete find the record through an in-memory key -> position index
+# instead of scanning the list, and each keyed write is kept in `changes` so
+# caches built on an earlier version can patch just the affected client.
+#
+# With a validator (see validation.py), every fresh load is checked before
+# it is handed out: invalid records are moved to <path>.quarantine.json with
+# the reasons they were rejected and left out of what read() returns, so
+# they drop out of client_data.json at the next write. The validator's
+# encoding of the clean records is kept for the loaded version (encoded()).
+#
+# With compression ("gzip", or "zstd" if zstandard is installed) the file is
+# written as compressed JSON Lines: a {"version": n, "columns": [...]}
+# header line, then one client per line as an array of its values in header
+# column order (an object if its keys differ). Loads parse the decompressing
+# stream one record at a time and hand each record straight to the
+# validator, so the file's text is never held whole, and records share the
+# header's key strings instead of each parsing its own. The format is
+# recognised by its magic bytes, so the file keeps its name and plain JSON
+# files are still read (and converted at the next write).
+#
+# Portfolios of ARROW_MIN_CLIENTS or more also get a memory-mappable Arrow
+# copy (see columnar.py). It is refreshed off the write path: a write only
+# wakes a background thread, which waits ARROW_DELAY so a burst of edits
+# costs one refresh, then writes the copy for the latest version. A load
+# whose stored version matches the copy's reads the records and their
+# encoding from the copy instead of parsing and validating the file. A copy
+# that cannot be read (corrupt, or pyarrow not installed) is removed and the
+# load falls back to the file.
+
+CHANGE_HISTORY = 64
+ARROW_MIN_CLIENTS = 20_000
+ARROW_DELAY = 2.0
+COMPRESSIONS = ("gzip", "zstd")
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+_MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+
+# One keyed write: old is None for an insert, new is None for a delete
+Change = namedtuple("Change", ["position", "old", "new"])
+
+
+def arrow_path_for(path):
+    return os.path.splitext(path)[0] + ".arrow"
+
+
+def client_key(name):
+    """Lookup key for a client name: case and surrounding/repeated whitespace are ignored."""
+    return " ".join(str(name).split()).casefold()
+
+
+# --- File format ---
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd client storage requires zstandard (pip install zstandard)") from e
+    return zstandard
+
+
+def detect_compression(path):
+    """ "gzip", "zstd" or None (plain JSON) from the file's magic bytes."""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    for magic, compression in _MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def _text_reader(raw, compression):
+    if compression == "gzip":
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="rb"), encoding="utf-8")
+    return io.TextIOWrapper(_zstandard().ZstdDecompressor().stream_reader(raw), encoding="utf-8")
+
+
+def _text_writer(raw, compression):
+    # Closing the writer finishes the compressed stream but leaves raw open for fsync
+    if compression == "gzip":
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL), encoding="utf-8")
+    compressor = _zstandard().ZstdCompressor(level=ZSTD_LEVEL)
+    return io.TextIOWrapper(compressor.stream_writer(raw, closefd=False), encoding="utf-8")
+
+
+def stored_version(path):
+    """The version in a client file's header, without parsing the clients where possible."""
+    compression = detect_compression(path)
+    if compression is not None:
+        with open(path, "rb") as raw, _text_reader(raw, compression) as f:
+            return json.loads(f.readline())["version"]
+    with open(path, "rb") as f:
+        match = re.match(rb'\{"version": (\d+),', f.read(64))
+    # write_data() puts the version first; anything else is parsed in full
+    return int(match.group(1)) if match else next(iter_data(path))
+
+
+def iter_data(path):
+    """Yield the stored version, then the client records one at a time."""
+    compression = detect_compression(path)
+    if compression is None:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            yield 0
+            yield from data
+        else:
+            yield data.get("version", 0)
+            yield from data.get("clients", [])
+        return
+    with open(path, "rb") as raw, _text_reader(raw, compression) as f:
+        header = json.loads(f.readline())
+        yield header["version"]
+        columns = header.get("columns", [])
+        for line in f:
+            if line.startswith("["):
+                # Positional record; every record shares the header's key strings
+                yield dict(zip(columns, json.loads(line)))
+            elif line.strip():
+                yield json.loads(line)
+
+
+def write_data(raw, version, clients, compression=None):
+    """Write a portfolio to an open binary file in the given storage format."""
+    if compression is None:
+        f = io.TextIOWrapper(raw, encoding="utf-8")
+        json.dump({"version": version, "clients": clients}, f)
+        f.flush()
+        f.detach()
+        return
+    columns = list(clients[0]) if clients and isinstance(clients[0], dict) else []
+    with _text_writer(raw, compression) as f:
+        f.write(json.dumps({"version": version, "columns": columns}) + "\n")
+        f.writelines(json.dumps(list(client.values()) if isinstance(client, dict) and list(client) == columns
+                                else client) + "\n" for client in clients)
+
+
+class VersionConflict(Exception):
+    def __init__(self, expected, actual):
+        super().__init__(f"client data is at version {actual}, expected {expected}")
+        self.expected = expected
+        self.actual = actual
+
+
+class StoreLockTimeout(Exception):
+    pass
+
+
+class UnknownClient(KeyError):
+    pass
+
+
+class DuplicateClient(ValueError):
+    pass
+
+
+class ClientStore:
+    def __init__(self, path, lock_timeout=10.0, stale_lock_after=30.0, validator=None, compression=None,
+                 arrow=True):
+        if compression not in (None,) + COMPRESSIONS:
+            raise ValueError(f"unknown compression {compression!r}")
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.log_path = path + ".log"
+        self.quarantine_path = path + ".quarantine.json"
+        self.arrow_path = arrow_path_for(path)
+        self.lock_timeout = lock_timeout
+        self.stale_lock_after = stale_lock_after
+        self.validator = validator
+        self.compression = compression
+        self.arrow = arrow
+        # Sessions share the store across threads: the cached state and key
+        # index are only read and replaced under _state_lock
+        self._state_lock = threading.RLock()
+        self._arrow_lock = threading.Lock()
+        self._arrow_thread = None
+        self._arrow_wanted = False
+        self._cache_key = None
+        self._cache = (0, [])
+        self._file_state = None
+        self._encoded = None
+        self._index = None
+        self.changes = {}
+
+    # --- Reading ---
+    def read(self):
+        """Return (version, clients), re-parsing only when the file changed."""
+        version, clients = self._current()
+        return version, list(clients)
+
+    def version(self):
+        return self._current()[0]
+
+    def get(self, name):
+        """The stored record for a client name, or None."""
+        with self._state_lock:
+            _, clients = self._current()
+            position = self._key_index().get(client_key(name))
+            return None if position is None else clients[position]
+
+    def file_state(self, version):
+        """[inode, mtime_ns, size] of the file when it was written or loaded at version, if that is known."""
+        state = self._file_state
+        if state is not None and state[0] == version:
+            return list(state[1])
+        return None
+
+    def encoded(self, version):
+        """The validator's encoding of the clients at version, if that version was loaded from disk."""
+        if self._encoded is not None and self._encoded[0] == version:
+            return self._encoded[1]
+        return None
+
+    def quarantined(self):
+        """Records the validator rejected, with their reasons, oldest first."""
+        if not os.path.exists(self.quarantine_path):
+            return []
+        with open(self.quarantine_path) as f:
+            return json.load(f)
+
+    def changes_between(self, old_version, new_version):
+        """Keyed changes that lead from old_version to new_version, or None if any is unknown."""
+        changes = [self.changes.get(v) for v in range(old_version + 1, new_version + 1)]
+        if old_version > new_version or None in changes:
+            return None
+        return changes
+
+    def _current(self):
+        # Also run by the Arrow refresh thread; one thread loads a changed
+        # file while the others wait for its result
+        with self._state_lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._cache_key = None
+                self._cache = (0, [])
+                self._file_state = None
+                self._index = None
+                return self._cache
+            key = self._stat_key(st)
+            if key != self._cache_key:
+                self._cache = self._load()
+                self._cache_key = key
+                self._file_state = (self._cache[0], key)
+                self._index = None
+            return self._cache
+
+    @staticmethod
+    def _stat_key(st):
+        # Every commit replaces the file, so the inode changes even when the
+        # size and a coarse mtime do not
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _key_index(self):
+        # client_key -> position; with legacy duplicate names the last one wins
+        with self._state_lock:
+            if self._index is None:
+                _, clients = self._cache
+                self._index = {client_key(c["Client"]): i for i, c in enumerate(clients)}
+            return self._index
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return 0, []
+        if self.arrow and os.path.exists(self.arrow_path):
+            try:
+                loaded = self._load_arrow(stored_version(self.path))
+            except Exception:
+                # A corrupt copy, or no pyarrow here: drop it and read the JSON
+                self._remove_arrow()
+                loaded = None
+            if loaded is not None:
+                return loaded
+        records = iter_data(self.path)
+        version = next(records)
+        if self.validator is not None:
+            loaded = self._validate(version, records)
+        else:
+            loaded = version, list(records)
+        if self.arrow and len(loaded[1]) >= ARROW_MIN_CLIENTS:
+            self._schedule_arrow()
+        return loaded
+
+    def _load_arrow(self, version):
+        # The copy is only ever written from clean records, so it needs no validation
+        from columnar import read_clients
+        arrow_version, clients, encoded = read_clients(self.arrow_path)
+        if arrow_version != version:
+            return None
+        self._encoded = (version, encoded)
+        return version, clients
+
+    def _validate(self, version, records):
+        clean, encoded, rejected = self.validator(records)
+        self._encoded = (version, encoded)
+        if rejected:
+            self._quarantine(version, rejected)
+        return version, clean
+
+    def _quarantine(self, version, rejected):
+        # Every load of the same file rejects the same records; keep one entry each
+        entries = self.quarantined()
+        seen = {json.dumps(entry["record"], sort_keys=True) for entry in entries}
+        added = 0
+        for item in rejected:
+            key = json.dumps(item["record"], sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                entries.append({"ts": time.time(), "version": version, **item})
+                added += 1
+        if not added:
+            return
+        directory = os.path.dirname(os.path.abspath(self.quarantine_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".quarantine.", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f, indent=1)
+        os.replace(tmp_path, self.quarantine_path)
+        self._log("quarantine", version, version, {"records": added})
+
+    # --- Writing ---
+    def compare_and_swap(self, expected_version, clients, op="write", detail=None):
+        """Replace the client list only if the stored version still matches."""
+        with self._locked():
+            version, _ = self._current()
+            if version != expected_version:
+                raise VersionConflict(expected_version, version)
+            return self._commit(version, clients, op, detail)
+
+    def add(self, record):
+        """Append a record without checking for an existing client of that name."""
+        with self._locked():
+            version, clients = self._current()
+            return self._commit_change(version, clients, Change(len(clients), None, record), "add")
+
+    def upsert(self, record):
+        """Insert the client, or replace the existing record with the same key."""
+        with self._locked():
+            version, clients = self._current()
+            position = self._key_index().get(client_key(record["Client"]))
+            if position is None:
+                change = Change(len(clients), None, record)
+            else:
+                change = Change(position, clients[position], record)
+            return self._commit_change(version, clients, change, "upsert")
+
+    def upsert_many(self, records, progress=None, every=10_000):
+        """Upsert a batch of clients as one write; later records win over earlier ones.
+
+        progress(done, total) is called every `every` records and once before
+        the write; if it raises, nothing is written.
+        """
+        with self._locked():
+            version, clients = self._current()
+            clients = list(clients)
+            index = dict(self._key_index())
+            for done, record in enumerate(records):
+                if progress is not None and done % every == 0:
+                    progress(done, len(records))
+                key = client_key(record["Client"])
+                position = index.get(key)
+                if position is None:
+                    index[key] = len(clients)
+                    clients.append(record)
+                else:
+                    clients[position] = record
+            if progress is not None:
+                progress(len(records), len(records))
+            new_version = self._commit(version, clients, "import", {"records": len(records)})
+        return new_version, list(clients)
+
+    def edit(self, name, record):
+        """Replace the client stored under name; record may carry a new name."""
+        with self._locked():
+            version, clients = self._current()
+            index = self._key_index()
+            position = index.get(client_key(name))
+            if position is None:
+                raise UnknownClient(name)
+            other = index.get(client_key(record["Client"]))
+            if other is not None and other != position:
+                raise DuplicateClient(f"a client named {record['Client']!r} already exists")
+            return self._commit_change(version, clients, Change(position, clients[position], record), "edit")
+
+    def delete(self, name):
+        """Remove the client stored under name."""
+        with self._locked():
+            version, clients = self._current()
+            position = self._key_index().get(client_key(name))
+            if position is None:
+                raise UnknownClient(name)
+            return self._commit_change(version, clients, Change(position, clients[position], None), "delete")
+
+    def reset(self, reason=None):
+        """Empty the store as a versioned, logged write instead of deleting the file."""
+        with self._locked():
+            version, clients = self._current()
+            return self._commit(version, [], "reset",
+                                {"removed": len(clients), "reason": reason})
+
+    def _commit_change(self, version, clients, change, op):
+        clients = list(clients)
+        if change.old is None:
+            clients.append(change.new)
+        elif change.new is None:
+            del clients[change.position]
+        else:
+            clients[change.position] = change.new
+        index = self._key_index()
+        detail = {"client": (change.new or change.old).get("Client"), "position": change.position}
+        new_version = self._commit(version, clients, op, detail)
+
+        # Keep the key index in step with the write instead of rebuilding it
+        with self._state_lock:
+            if change.new is None:
+                self._index = None  # later positions shift down
+            else:
+                if change.old is not None:
+                    index.pop(client_key(change.old["Client"]), None)
+                index[client_key(change.new["Client"])] = change.position
+                self._index = index
+        self.changes[new_version] = change
+        self.changes.pop(new_version - CHANGE_HISTORY, None)
+        return new_version, list(clients)
+
+    def _commit(self, version, clients, op, detail):
+        new_version = version + 1
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".client_data.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write_data(f, new_version, clients, self.compression)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # The file now holds exactly this state; no need to parse it again
+        with self._state_lock:
+            self._cache = (new_version, clients)
+            self._cache_key = self._stat_key(os.stat(self.path))
+            self._file_state = (new_version, self._cache_key)
+            self._index = None
+        self._log(op, version, new_version, detail)
+        if self.arrow and len(clients) >= ARROW_MIN_CLIENTS:
+            self._schedule_arrow()
+        elif os.path.exists(self.arrow_path):
+            self._remove_arrow()
+        return new_version
+
+    # --- Arrow copy ---
+    def sync_arrow(self):
+        """Bring the Arrow copy in line with the current version now; True if it is current."""
+        version, clients = self._current()
+        if not self.arrow or len(clients) < ARROW_MIN_CLIENTS:
+            self._remove_arrow()
+            return False
+        from columnar import arrow_version, encoded_to_table, write_table
+        if arrow_version(self.arrow_path) == version:
+            return True
+        encoded = self.encoded(version)
+        if encoded is None:
+            # Written in this process, not loaded: check it like a load would
+            from validation import validate_clients
+            _, encoded, rejected = (self.validator or validate_clients)(clients)
+            if rejected:
+                # Left to the next load of the file to quarantine
+                self._remove_arrow()
+                return False
+        write_table(encoded_to_table(encoded), self.arrow_path, version)
+        return True
+
+    def _schedule_arrow(self):
+        with self._arrow_lock:
+            self._arrow_wanted = True
+            if self._arrow_thread is None:
+                self._arrow_thread = threading.Thread(target=self._refresh_arrow, name="arrow-copy", daemon=True)
+                self._arrow_thread.start()
+
+    def _refresh_arrow(self):
+        while True:
+            time.sleep(ARROW_DELAY)
+            with self._arrow_lock:
+                if not self._arrow_wanted:
+                    self._arrow_thread = None
+                    return
+                self._arrow_wanted = False
+            try:
+                self.sync_arrow()
+            except Exception:
+                # A missing copy only means loads and scoring take the JSON path
+                self._remove_arrow()
+
+    def _remove_arrow(self):
+        try:
+            os.remove(self.arrow_path)
+        except FileNotFoundError:
+            pass
+
+    def _log(self, op, old_version, new_version, detail):
+        entry = {"ts": time.time(), "op": op, "from": old_version, "to": new_version}
+        if detail:
+            entry.update(detail)
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    # --- Locking ---
+    def _locked(self):
+        return LockFile(self.lock_path, self.lock_timeout, self.stale_lock_after)
+
+
+class LockFile:
+    def __init__(self, path, timeout, stale_after):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                self._break_if_stale()
+                if time.monotonic() > deadline:
+                    raise StoreLockTimeout(f"could not acquire {self.path}")
+                time.sleep(0.01)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _break_if_stale(self):
+        # A crashed writer can leave its lock behind; reclaim it after a while.
+        try:
+            if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                os.remove(self.path)
+        except FileNotFoundError:
+            pass
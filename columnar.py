@@ -0,0 +1,149 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+
+from client_store import arrow_path_for, iter_data
+from scoring import INPUT_COLUMNS, LEVELS, result_frames, score_encoded
+
+# Arrow IPC (Feather v2) copy of the portfolio for large books.
+#
+# Categorical columns are dictionary-encoded with the scoring engine's level
+# order, so their indices are the scoring codes and can be used as-is. The
+# file is written uncompressed and opened with a memory map, which makes
+# reading it zero-copy: the scoring engine works on views of the mapped pages
+# instead of parsing JSON into dicts and copying them into a DataFrame.
+#
+# client_data.json stays the source of truth. Once the portfolio reaches
+# ARROW_MIN_CLIENTS, ClientStore refreshes the Arrow copy in the background
+# after writes and loads from it when it is current (read_clients()); the
+# file records the store version it was written from, so a stale copy is
+# never used. Smaller portfolios simply keep using JSON.
+
+VERSION_KEY = b"client_data_version"
+READ_CHUNK = 20_000
+
+SCHEMA = pa.schema(
+    [pa.field("Client", pa.string()), pa.field("R&D Spend", pa.float64())]
+    + [pa.field(col, pa.dictionary(pa.int8(), pa.string())) for col in LEVELS]
+)
+
+
+def clients_to_table(clients):
+    columns = [
+        pa.array([c["Client"] for c in clients], pa.string()),
+        pa.array([c["R&D Spend"] for c in clients], pa.float64()),
+    ]
+    for col, levels in LEVELS.items():
+        code_of = {level: i for i, level in enumerate(levels)}
+        indices = pa.array([code_of[c[col]] for c in clients], pa.int8())
+        columns.append(pa.DictionaryArray.from_arrays(indices, pa.array(levels)))
+    return pa.Table.from_arrays(columns, schema=SCHEMA)
+
+
+def encoded_to_table(encoded):
+    """The table for validation's encoding of clean records ({"names", "codes", "spend"})."""
+    columns = [pa.array(encoded["names"], pa.string()), pa.array(encoded["spend"], pa.float64())]
+    for col, levels in LEVELS.items():
+        indices = pa.array(encoded["codes"][col], pa.int8())
+        columns.append(pa.DictionaryArray.from_arrays(indices, pa.array(levels)))
+    return pa.Table.from_arrays(columns, schema=SCHEMA)
+
+
+def write_arrow(clients, path, version):
+    write_table(clients_to_table(clients), path, version)
+
+
+def write_table(table, path, version):
+    table = table.replace_schema_metadata({VERSION_KEY: str(version)})
+    # Unique temp name: another process may be refreshing the same copy
+    fd, tmp_path = tempfile.mkstemp(prefix=".arrow.", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_arrow(path):
+    """Memory-map the file and return (version, table) without copying the column data."""
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    metadata = table.schema.metadata or {}
+    return int(metadata.get(VERSION_KEY, -1)), table
+
+
+def arrow_version(path):
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path, "r") as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return int(metadata.get(VERSION_KEY, -1))
+
+
+def table_codes(table):
+    """Scoring codes per categorical column, as views of the dictionary indices where possible."""
+    codes = {}
+    for col, levels in LEVELS.items():
+        chunked = table.column(col)
+        parts = []
+        for chunk in chunked.chunks:
+            dictionary = chunk.dictionary.to_pylist()
+            indices = chunk.indices.to_numpy(zero_copy_only=chunk.null_count == 0)
+            if dictionary != levels:
+                # Foreign dictionary order: translate once per chunk, not per row
+                remap = np.array([levels.index(v) for v in dictionary], dtype=np.int8)
+                indices = remap[indices]
+            parts.append(indices)
+        codes[col] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+    return codes
+
+
+def score_table(table):
+    """Score an Arrow portfolio table; returns (df_results, df_maturity) like score_frame()."""
+    spend = table.column("R&D Spend").to_numpy()
+    scored = score_encoded(table_codes(table), spend)
+    return result_frames(table.column("Client").to_numpy(), scored)
+
+
+def read_clients(path):
+    """(version, clients, encoded) from an Arrow copy, as a validated JSON load returns them.
+
+    The records share one string per level and hold whole-dollar spends as
+    int, like records parsed from the file; encoded is {"names", "codes",
+    "spend"} with the codes and spend as views of the mapped file.
+    """
+    version, table = read_arrow(path)
+    names = table.column("Client").to_pylist()
+    spend = table.column("R&D Spend").to_numpy()
+    codes = table_codes(table)
+    level_values = [np.array(levels, dtype=object) for levels in LEVELS.values()]
+    clients = []
+    # In slices, so the per-column lists zipped into records stay small
+    for start in range(0, len(names), READ_CHUNK):
+        stop = start + READ_CHUNK
+        columns = [names[start:stop], [int(v) if v.is_integer() else v for v in spend[start:stop].tolist()]]
+        columns += [values[codes[col][start:stop]].tolist() for col, values in zip(LEVELS, level_values)]
+        clients.extend(dict(zip(INPUT_COLUMNS, row)) for row in zip(*columns))
+    return version, clients, {"names": np.array(names, dtype=object), "codes": codes, "spend": spend}
+
+
+def convert(json_path, arrow_path=None):
+    """Write the Arrow copy of an existing client_data.json; returns its path."""
+    arrow_path = arrow_path or arrow_path_for(json_path)
+    records = iter_data(json_path)
+    version = next(records)
+    write_arrow(list(records), arrow_path, version)
+    return arrow_path
+
+
+if __name__ == "__main__":
+    # python columnar.py [client_data.json] [client_data.arrow]
+    print(convert(*(sys.argv[1:] or ["client_data.json"])))
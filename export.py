@@ -0,0 +1,98 @@
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scoring import iter_scored_chunks, metric_values, tiers_for
+
+# Streaming exports of the scored portfolio. Rows are scored chunk by chunk
+# and written straight to the output, so only one chunk of results is ever
+# held in memory regardless of how many clients there are. With a tier
+# metric and its cut-offs (portfolio.tier_cutoffs()), each chunk is re-tiered
+# by portfolio percentile like the dashboard table.
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def iter_export_chunks(clients, chunk_size=50_000, progress=None, metric=None, cutoffs=None):
+    """Scored results with the AI roadmap alongside, one chunk at a time.
+
+    progress(done, total) is called before each chunk with the clients done so far.
+    """
+    done = 0
+    for df_results, df_maturity in iter_scored_chunks(clients, chunk_size):
+        if progress is not None:
+            progress(done, len(clients))
+        if metric is not None:
+            df_results["Priority Tier"] = tiers_for(metric_values(df_results, metric), cutoffs)
+        df_results["AI Roadmap"] = df_maturity["AI Roadmap"]
+        yield df_results
+        done += len(df_results)
+    if progress is not None:
+        progress(done, len(clients))
+
+
+def iter_csv(chunks):
+    """Yield encoded CSV text, header first, one block per chunk."""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+def write_csv(chunks, f):
+    for block in iter_csv(chunks):
+        f.write(block)
+
+
+def write_parquet(chunks, f):
+    # Categorical columns become Arrow dictionary columns; the category lists
+    # are fixed by the scoring engine so every row group shares one schema.
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(f, table.schema)
+        writer.write_table(table)
+    if writer is not None:
+        writer.close()
+
+
+def write_xlsx(chunks, f):
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise ImportError("Excel export requires openpyxl (pip install openpyxl)") from e
+
+    # write_only workbooks stream rows to disk instead of building a cell tree
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Opportunity Summary")
+    header = True
+    for chunk in chunks:
+        if header:
+            ws.append(list(chunk.columns))
+            header = False
+        for row in chunk.itertuples(index=False):
+            ws.append(list(row))
+    wb.save(f)
+
+
+WRITERS = {"CSV": write_csv, "Parquet": write_parquet, "Excel": write_xlsx}
+
+
+def export_file(clients, fmt, f, chunk_size=50_000, progress=None, metric=None, cutoffs=None):
+    """Stream the scored portfolio to an open binary file in the given format."""
+    WRITERS[fmt](iter_export_chunks(clients, chunk_size, progress, metric, cutoffs), f)
+
+
+def export_bytes(clients, fmt, chunk_size=50_000, progress=None, metric=None, cutoffs=None):
+    # Streamlit's download button needs the finished file as bytes; build it
+    # on disk first so only the encoded output, not the frame, is held.
+    with tempfile.TemporaryFile() as f:
+        export_file(clients, fmt, f, chunk_size, progress, metric, cutoffs)
+        f.seek(0)
+        return f.read()
@@ -0,0 +1,205 @@
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Background jobs for long operations (bulk imports, exports, ...).
+#
+# A JobQueue runs submitted functions on a small thread pool so the Streamlit
+# script thread only submits and polls. A job function is called as
+# fn(job, *args) and reports through job.progress(done, total, message);
+# progress() raises Cancelled once cancel() has been asked for, so a job
+# stops at its next report. Queued jobs are cancelled before they start.
+#
+# Every job's state is written to JOBS_DIR/<id>.json and a finished job's
+# return value is pickled to JOBS_DIR/<id>.pkl, so results outlive the
+# session that asked for them and survive a restart. Jobs a restart caught
+# running are marked failed. Only the KEEP most recent finished jobs are kept.
+
+JOBS_DIR = "jobs"
+WORKERS = 2
+KEEP = 50
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, label, owner=None, kind=None, meta=None, job_id=None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.label = label
+        self.owner = owner
+        self.kind = kind
+        self.meta = meta or {}
+        self.state = QUEUED
+        self.done = 0
+        self.total = None
+        self.message = ""
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._future = None
+
+    def progress(self, done, total=None, message=None):
+        """Report progress from the job function; raises Cancelled if the job was cancelled."""
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    @property
+    def fraction(self):
+        if self.state == DONE:
+            return 1.0
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in
+                ("id", "label", "owner", "kind", "meta", "state", "done", "total", "message", "error",
+                 "created", "started", "finished")}
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data["label"], job_id=data["id"])
+        for key, value in data.items():
+            setattr(job, key, value)
+        return job
+
+
+class JobQueue:
+    def __init__(self, directory=JOBS_DIR, workers=WORKERS, keep=KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    job = Job.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError):
+                continue
+            if job.state not in FINISHED:
+                # The process that ran it is gone
+                job.state, job.error, job.finished = FAILED, "interrupted by a restart", time.time()
+                self._save(job)
+            self._jobs[job.id] = job
+
+    # --- Submitting ---
+    def submit(self, label, fn, *args, owner=None, kind=None, meta=None):
+        """Queue fn(job, *args) to run in the background; returns the Job.
+
+        meta is kept with the job's state for the UI, e.g. a download's file name.
+        """
+        job = Job(label, owner, kind, meta)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._save(job)
+            job._future = self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        if job.cancel_requested:
+            self._finish(job, CANCELLED)
+            return
+        job.state, job.started = RUNNING, time.time()
+        with self._lock:
+            self._save(job)
+        try:
+            result = fn(job, *args)
+        except Cancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            self._finish(job, FAILED)
+        else:
+            with open(self._path(job.id, ".pkl"), "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._finish(job, DONE)
+
+    def _finish(self, job, state):
+        job.state, job.finished = state, time.time()
+        with self._lock:
+            self._save(job)
+            self._prune()
+
+    def cancel(self, job_id):
+        """Ask a job to stop; a queued job never starts, a running one stops at its next report."""
+        job = self._jobs.get(job_id)
+        if job is None or job.state in FINISHED:
+            return False
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    # --- Status and results ---
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        """Jobs, newest first; only owner's if given."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if owner is None or job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def active(self, owner=None):
+        return [job for job in self.jobs(owner) if job.state not in FINISHED]
+
+    def result(self, job_id):
+        """The return value of a finished job, read back from disk."""
+        with open(self._path(job_id, ".pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def remove(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state not in FINISHED:
+                return False
+            self._forget(job)
+            return True
+
+    # --- Files ---
+    def _path(self, job_id, suffix):
+        return os.path.join(self.directory, job_id + suffix)
+
+    def _save(self, job):
+        path = self._path(job.id, ".json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    def _forget(self, job):
+        del self._jobs[job.id]
+        for suffix in (".json", ".pkl"):
+            if os.path.exists(self._path(job.id, suffix)):
+                os.remove(self._path(job.id, suffix))
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if job.state in FINISHED),
+                          key=lambda job: job.finished, reverse=True)
+        for job in finished[self.keep:]:
+            self._forget(job)
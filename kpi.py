@@ -0,0 +1,74 @@
+from scoring import AI_COLUMNS, TIERS, score_record
+
+# Running portfolio aggregates for the KPI header. Each add/remove adjusts the
+# totals by one client, so rendering the metrics never scans the portfolio.
+
+AI_LEVELS = {"Low": 1, "Medium": 2, "High": 3}
+
+
+class PortfolioKpis:
+    def __init__(self):
+        self.count = 0
+        self.total_spend = 0
+        self.total_revenue = 0.0
+        self.ai_points = 0
+        self.tier_counts = {tier: 0 for tier in TIERS}
+        self.tier_revenue = {tier: 0.0 for tier in TIERS}
+
+    @classmethod
+    def from_clients(cls, clients):
+        kpis = cls()
+        for client in clients:
+            kpis.add(client)
+        return kpis
+
+    def copy(self):
+        kpis = PortfolioKpis()
+        kpis.__dict__.update(self.__dict__)
+        kpis.tier_counts = dict(self.tier_counts)
+        kpis.tier_revenue = dict(self.tier_revenue)
+        return kpis
+
+    def merge(self, other):
+        """Fold another portfolio's totals (e.g. another partition's) into these."""
+        self.count += other.count
+        self.total_spend += other.total_spend
+        self.total_revenue += other.total_revenue
+        self.ai_points += other.ai_points
+        for tier in TIERS:
+            self.tier_counts[tier] += other.tier_counts[tier]
+            self.tier_revenue[tier] += other.tier_revenue[tier]
+        return self
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        kpis = cls()
+        kpis.__dict__.update(data)
+        return kpis
+
+    def add(self, client):
+        self._apply(client, 1)
+
+    def remove(self, client):
+        self._apply(client, -1)
+
+    def _apply(self, client, sign):
+        row, _ = score_record(client)
+        tier = row["Priority Tier"]
+        revenue = row["Estimated Revenue Opportunity"]
+        self.count += sign
+        self.total_spend += sign * client["R&D Spend"]
+        self.total_revenue += sign * revenue
+        self.ai_points += sign * sum(AI_LEVELS[client[col]] for col in AI_COLUMNS)
+        self.tier_counts[tier] += sign
+        self.tier_revenue[tier] += sign * revenue
+
+    @property
+    def avg_ai_maturity(self):
+        """Mean of the three GenAI levels (Low=1 .. High=3) across all clients."""
+        if not self.count:
+            return 0.0
+        return self.ai_points / (len(AI_COLUMNS) * self.count)
@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench import REPO_DIR, synthetic_clients
+
+# Concurrent-session load test for the dashboards.
+#
+#   python loadtest.py [--app app.py] [--sessions 1,4,16] [--reruns 30]
+#                      [--clients 2000] [--mix add=3,chat=3,view=6,reset=0.1]
+#
+# Every simulated analyst is an AppTest driving the real script in this
+# process, on its own thread, the way the Streamlit server runs one script
+# thread per session and shares cache_resource / portfolio caches between
+# them. Each session performs a random mix of sidebar adds, chat questions,
+# plain reruns and (rarely) resets. The harness reports throughput, rerun
+# latency percentiles and resident memory per session count.
+#
+# The run happens in a scratch directory seeded with synthetic clients, and
+# OpenAI calls go to a local mock (OPENAI_BASE_URL), so no real data or API
+# key is touched.
+
+DEFAULT_MIX = {"add": 3, "chat": 3, "view": 6, "reset": 0.1}
+
+# The mock's answer: a query plan (see query_plan.py), so app 10 runs it
+MOCK_ANSWER = json.dumps({
+    "filters": [{"column": "AI Appetite", "op": "==", "value": "High"}],
+    "sort": [{"column": "Estimated Revenue Opportunity", "descending": True}],
+    "limit": 10,
+    "columns": ["Estimated Revenue Opportunity", "AI Category"],
+    "explanation": "Mock answer from the load test.",
+})
+
+
+# --- Mock OpenAI endpoint ---
+class _MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        body = json.dumps({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": MOCK_ANSWER},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_openai(latency=0.0):
+    """Serve canned chat completions on a free local port; returns the server."""
+    handler = type("MockOpenAIHandler", (_MockOpenAIHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    return server
+
+
+# --- Memory ---
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # Peak rather than current RSS (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+# --- Shared runtime ---
+def share_runtime():
+    """Let concurrent AppTests share one runtime, as sessions do on a real server.
+
+    Each AppTest run installs its own mock Runtime as the process singleton and
+    clears it when the run ends, which would pull the runtime out from under
+    sessions still running on other threads. Lookups fall back to the last
+    runtime installed instead. Likewise the run-scoped "global.appTest" option
+    is pinned on for the whole test, so one run finishing doesn't switch it
+    off for the others, and all runs share one script bytecode cache (a fresh
+    cache per run also means compiling concurrently, which CPython's ast
+    module doesn't survive).
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.util import patch_config_options
+
+    if getattr(Runtime, "_load_test_shared", False):
+        return
+    # Keep a reference: a collected context manager would undo the patch
+    Runtime._load_test_config = patch_config_options({"global.appTest": True})
+    Runtime._load_test_config.__enter__()
+    shared_cache = ScriptCache()
+    ScriptCache.__init__ = lambda self: self.__dict__.update(shared_cache.__dict__)
+    last = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+        if "runtime" not in last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last["runtime"]
+
+    def exists(cls):
+        return cls._instance is not None or "runtime" in last
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+    Runtime._load_test_shared = True
+
+
+# --- Simulated analyst ---
+def _find(widgets, label):
+    for widget in widgets:
+        if widget.label == label or widget.label.startswith(label):
+            return widget
+    return None
+
+
+class Session:
+    def __init__(self, app_path, mix, seed, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(app_path, default_timeout=timeout)
+        self.rng = random.Random(seed)
+        self.actions = list(mix)
+        self.weights = [mix[a] for a in self.actions]
+        self.latencies = []
+        self.errors = 0
+        self.counter = 0
+        self._timed(self.at.run)
+
+    def _timed(self, run):
+        start = time.perf_counter()
+        try:
+            run()
+        except Exception:
+            self.errors += 1
+        else:
+            self.errors += len(self.at.exception)
+        self.latencies.append(time.perf_counter() - start)
+
+    def step(self):
+        action = self.rng.choices(self.actions, self.weights)[0]
+        getattr(self, f"do_{action}")()
+
+    def do_view(self):
+        self._timed(self.at.run)
+
+    def do_add(self):
+        name = _find(self.at.sidebar.text_input, "Client Name")
+        submit = _find(self.at.sidebar.button, "Add Client")
+        if name is None or submit is None:
+            return self.do_view()
+        self.counter += 1
+        name.input(f"Load {id(self) % 10_000:04d}-{self.counter:04d}")
+        self.at.sidebar.number_input[0].set_value(self.rng.randrange(0, 2_000_000_000, 1_000_000))
+        for field, values in (("Global Footprint", ["Local", "Regional", "Global"]),
+                              ("GenAI Appetite", ["Low", "Medium", "High"])):
+            select = _find(self.at.sidebar.selectbox, field)
+            if select is not None:
+                select.set_value(self.rng.choice(values))
+        self._timed(submit.click().run)
+
+    def do_chat(self):
+        question = _find(self.at.text_input, "Ask a question")
+        if question is not None:
+            tier = self.rng.choice(["high", "medium", "low", "top"])
+            return self._timed(question.input(f"who has {tier} opportunity? {self.counter}").run)
+        # GPT panel (app 10): key, question, button; answered by the mock
+        key = _find(self.at.text_input, "Enter your OpenAI API Key")
+        area = _find(self.at.text_area, "Ask a question")
+        ask = _find(self.at.button, "Ask GPT-4")
+        if key is None or area is None or ask is None:
+            return self.do_view()
+        key.input("sk-load-test")
+        area.input(f"Who is most ready for GenAI scale-up? {self.rng.random():.4f}")
+        self._timed(ask.click().run)
+
+    def do_reset(self):
+        reset = _find(self.at.sidebar.button, "Reset All Client Data")
+        if reset is None:
+            return self.do_view()
+        self._timed(reset.click().run)
+
+
+def run_level(app_path, n_sessions, reruns, mix, timeout, seed=0):
+    """Drive n_sessions concurrent sessions for `reruns` actions each."""
+    share_runtime()
+    sessions = [None] * n_sessions
+    barrier = threading.Barrier(n_sessions + 1)
+
+    def worker(i):
+        sessions[i] = Session(app_path, mix, seed * 1000 + i, timeout)
+        barrier.wait()
+        for _ in range(reruns):
+            sessions[i].step()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(n_sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # The first latency of every session is its initial page load
+    latencies = sorted(t for s in sessions for t in s.latencies[1:])
+    return {
+        "sessions": n_sessions,
+        "reruns": len(latencies),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": _percentile(latencies, 0.50),
+        "p95": _percentile(latencies, 0.95),
+        "p99": _percentile(latencies, 0.99),
+        "first_load": statistics.mean(s.latencies[0] for s in sessions),
+        "errors": sum(s.errors for s in sessions),
+    }
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def load_test(app, session_counts, reruns, n_clients, mix, timeout, openai_latency):
+    app_path = os.path.join(REPO_DIR, app)
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    previous_dir = os.getcwd()
+    server = start_mock_openai(openai_latency)
+    try:
+        os.chdir(workdir)
+        with open("client_data.json", "w") as f:
+            json.dump({"version": 1, "clients": synthetic_clients(n_clients)}, f)
+
+        print(f"{app} with {n_clients:,} clients, {reruns} actions per session, mix {mix}")
+        print(f"{'sessions':>8} {'reruns':>7} {'rerun/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'load ms':>8} {'errors':>6} {'RSS MB':>8} {'+MB/sess':>8}")
+        results = []
+        for n_sessions in session_counts:
+            before = rss_mb()
+            r = run_level(app_path, n_sessions, reruns, mix, timeout)
+            r["rss_mb"] = rss_mb()
+            r["rss_per_session_mb"] = (r["rss_mb"] - before) / n_sessions
+            results.append(r)
+            print(f"{r['sessions']:>8} {r['reruns']:>7} {r['throughput']:>8.1f} {r['p50'] * 1000:>8.0f} "
+                  f"{r['p95'] * 1000:>8.0f} {r['p99'] * 1000:>8.0f} {r['first_load'] * 1000:>8.0f} "
+                  f"{r['errors']:>6} {r['rss_mb']:>8.0f} {r['rss_per_session_mb']:>8.1f}")
+        return results
+    finally:
+        os.chdir(previous_dir)
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        action, _, weight = part.partition("=")
+        if action not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown action {action!r}")
+        mix[action] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--sessions", default="1,4,16",
+                        type=lambda s: [int(n) for n in s.split(",")])
+    parser.add_argument("--reruns", type=int, default=30, help="actions per session")
+    parser.add_argument("--clients", type=int, default=2_000, help="seeded portfolio size")
+    parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-rerun timeout (s)")
+    parser.add_argument("--openai-latency", type=float, default=0.5,
+                        help="seconds the mock OpenAI endpoint takes to answer")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = load_test(args.app, args.sessions, args.reruns, args.clients, args.mix,
+                        args.timeout, args.openai_latency)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import threading
+
+import portfolio
+from client_store import LockFile, client_key
+
+# Portfolios partitioned by engagement team.
+#
+# Each team's clients live in their own ClientStore file (a shard), so a
+# session loads and scores only the team it works on. A small manifest lists
+# the partitions; the legacy client_data.json is the "Default" partition.
+#
+# Next to every shard sits <shard>.summary.json with precomputed aggregates:
+# the KPI totals and the Total Score / revenue quantile sketches. They are
+# refreshed after each write, and overview() combines them across teams
+# (totals add up, KLL sketches merge) without opening any shard. A summary is
+# rebuilt from its shard only when the shard file changed behind its back:
+# it is stamped with the file state the store saw at the summary's version,
+# so a late refresh of an older version is never mistaken for current.
+
+DEFAULT_PARTITION = "Default"
+PARTITION_DIR = "portfolios"
+
+
+class DuplicatePartition(ValueError):
+    pass
+
+
+def slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", client_key(name)).strip("-") or "team"
+
+
+def _file_state(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+class PartitionSet:
+    def __init__(self, directory=PARTITION_DIR, default_file="client_data.json"):
+        self.directory = directory
+        self.default_file = default_file
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self._lock = threading.Lock()
+
+    # --- Manifest ---
+    def partitions(self):
+        if not os.path.exists(self.manifest_path):
+            return [{"name": DEFAULT_PARTITION, "file": self.default_file}]
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)["partitions"]
+
+    def names(self):
+        return [p["name"] for p in self.partitions()]
+
+    def path(self, name):
+        for partition in self.partitions():
+            if partition["name"] == name:
+                return partition["file"]
+        raise KeyError(name)
+
+    def create(self, name):
+        """Register a new, empty team partition; returns its shard path."""
+        os.makedirs(self.directory, exist_ok=True)
+        with LockFile(self.manifest_path + ".lock", timeout=10.0, stale_after=30.0):
+            partitions = self.partitions()
+            if any(client_key(p["name"]) == client_key(name) for p in partitions):
+                raise DuplicatePartition(f"a team named {name!r} already exists")
+            taken = {p["file"] for p in partitions}
+            path = os.path.join(self.directory, slug(name) + ".json")
+            suffix = 1
+            while path in taken:
+                suffix += 1
+                path = os.path.join(self.directory, f"{slug(name)}-{suffix}.json")
+            partitions.append({"name": name, "file": path})
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"partitions": partitions}, f, indent=1)
+            os.replace(tmp_path, self.manifest_path)
+        return path
+
+    # --- Summaries ---
+    def summary_path(self, name):
+        return os.path.splitext(self.path(name))[0] + ".summary.json"
+
+    def refresh(self, name, version, clients):
+        """Recompute a partition's summary after a write, from the shared per-version caches."""
+        from scoring import TIER_METRICS
+        path = self.path(name)
+        summary = {
+            "version": version,
+            "file_state": portfolio.get_store(path).file_state(version),
+            "kpis": portfolio.kpis(path, version, clients).to_dict(),
+            "sketches": {m: portfolio.tier_sketch(path, version, clients, m).to_dict() for m in TIER_METRICS},
+        }
+        summary_path = self.summary_path(name)
+        with self._lock:
+            tmp_path = summary_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(summary, f)
+            os.replace(tmp_path, summary_path)
+        return summary
+
+    def summary(self, name):
+        """A partition's summary, rebuilt from the shard only if the shard changed since."""
+        summary_path = self.summary_path(name)
+        if os.path.exists(summary_path):
+            with open(summary_path, "r") as f:
+                summary = json.load(f)
+            if summary["file_state"] == _file_state(self.path(name)):
+                return summary
+        version, clients = portfolio.get_store(self.path(name)).read()
+        return self.refresh(name, version, clients)
+
+    def overview(self, names=None):
+        """Per-team KPI totals plus the combined totals and merged sketches of all of them.
+
+        Returns (rows, combined_kpis, combined_sketches).
+        """
+        from kpi import PortfolioKpis
+        from quantiles import KllSketch
+
+        rows = []
+        combined = PortfolioKpis()
+        sketches = {}
+        for name in names or self.names():
+            summary = self.summary(name)
+            kpis = PortfolioKpis.from_dict(summary["kpis"])
+            rows.append({"Team": name, **kpi_row(kpis)})
+            combined.merge(kpis)
+            for metric, data in summary["sketches"].items():
+                sketch = KllSketch.from_dict(data)
+                if metric in sketches:
+                    sketches[metric].merge(sketch)
+                else:
+                    sketches[metric] = sketch
+        return rows, combined, sketches
+
+
+def kpi_row(kpis):
+    """Overview table columns for one set of KPI totals."""
+    return {
+        "Clients": kpis.count,
+        "R&D Spend": kpis.total_spend,
+        "Revenue Opportunity": kpis.total_revenue,
+        **{f"{tier} Clients": count for tier, count in kpis.tier_counts.items()},
+    }
+
@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+
+from client_store import ClientStore
+
+# Process-wide portfolio state shared by every session: one ClientStore per
+# data file and, for its latest version, the scored results and aggregates.
+# warm_up() fills them before the first visitor arrives (see serve.py). Heavy
+# modules are imported on first use so a cold script run only pays for what
+# it renders.
+#
+# When the store recorded the keyed changes since the cached version (upsert,
+# edit, delete made in this process), the cached values are patched for just
+# those clients; anything else is rebuilt from the full portfolio.
+
+# Storage format for client files written from here: "gzip" (default),
+# "zstd" or "none" for plain JSON (see client_store.py)
+COMPRESSION = os.environ.get("CLIENT_DATA_COMPRESSION", "gzip")
+
+_stores = {}
+_derived = {}
+_lock = threading.Lock()
+_build_locks = {}
+_optimizer = None
+
+warmup_seconds = None
+
+
+def get_store(path):
+    with _lock:
+        if path not in _stores:
+            _stores[path] = ClientStore(path, validator=_validate,
+                                        compression=None if COMPRESSION == "none" else COMPRESSION)
+            _build_locks[path] = threading.RLock()
+        return _stores[path]
+
+
+def scored(path, version, clients):
+    """(df_results, df_maturity) for this version of the portfolio, scored once per process."""
+    return _cached(path, "scored", version, clients, _score, _patch_frames)
+
+
+def rollup_cube(path, version, clients, metric=None):
+    """RollupCube for this version of the portfolio, tiered like tiered()."""
+    if metric is not None:
+        # Percentile cut-offs move with every change, so there is nothing to patch
+        def build_tiered(store, version, clients):
+            from rollups import RollupCube
+            df_results, _, _ = tiered(path, version, clients, metric)
+            return RollupCube.from_clients(clients, df_results["Priority Tier"].cat.codes.to_numpy())
+        return _cached(path, f"cube:{metric}", version, clients, build_tiered, lambda cube, changes: None)
+
+    def build(store, version, clients):
+        from rollups import RollupCube
+        return RollupCube.from_clients(clients)
+    return _cached(path, "cube", version, clients, build, _patch_aggregate)
+
+
+def kpis(path, version, clients):
+    """PortfolioKpis for this version of the portfolio."""
+    def build(store, version, clients):
+        from kpi import PortfolioKpis
+        return PortfolioKpis.from_clients(clients)
+    return _cached(path, "kpis", version, clients, build, _patch_aggregate)
+
+
+def name_index(path, version, clients):
+    """Typeahead NameIndex over client names for this version of the portfolio."""
+    def build(store, version, clients):
+        from search import NameIndex
+        return NameIndex.from_clients(clients)
+    return _cached(path, "names", version, clients, build, _patch_aggregate)
+
+
+def allocator(path, version, clients, metric=None):
+    """Capacity Allocator (see allocation.py) over this version of the portfolio, tiered like tiered()."""
+    if metric is not None:
+        def build_tiered(store, version, clients):
+            df_results, _, _ = tiered(path, version, clients, metric)
+            return allocator(path, version, clients).with_tiers(df_results["Priority Tier"].cat.codes.to_numpy())
+        return _cached(path, f"allocator:{metric}", version, clients, build_tiered, lambda allocator, changes: None)
+
+    def build(store, version, clients):
+        from allocation import Allocator
+        df_results, _ = scored(path, version, clients)
+        return Allocator.from_results(df_results, clients)
+    return _cached(path, "allocator", version, clients, build, lambda allocator, changes: allocator.apply(changes))
+
+
+def upgrades(path, version, clients, max_steps):
+    """UpgradeOptimizer ranking (see upgrades.py) of this version of the portfolio within max_steps."""
+    def build(store, version, clients):
+        encoded = store.encoded(version)
+        if encoded is not None:
+            return optimizer().rank_encoded(encoded["names"], encoded["codes"], encoded["spend"], max_steps)
+        return optimizer().portfolio(clients, max_steps)
+    # Any change can reorder the ranking, so a new version is ranked afresh
+    return _cached(path, f"upgrades:{max_steps}", version, clients, build, lambda ranked, changes: None)
+
+
+def optimizer():
+    """The process-wide UpgradeOptimizer; its grids only depend on the scoring rules."""
+    global _optimizer
+    with _lock:
+        if _optimizer is None:
+            from upgrades import UpgradeOptimizer
+            _optimizer = UpgradeOptimizer()
+        return _optimizer
+
+
+def tier_sketch(path, version, clients, metric):
+    """KllSketch of a tier metric (see scoring.TIER_METRICS) over this version of the portfolio."""
+    def build(store, version, clients):
+        from quantiles import KllSketch
+        from scoring import metric_values
+        df_results, _ = scored(path, version, clients)
+        return KllSketch.from_values(metric_values(df_results, metric))
+    return _cached(path, f"sketch:{metric}", version, clients, build,
+                   lambda sketch, changes: _patch_sketch(sketch, changes, metric))
+
+
+def tier_cutoffs(path, version, clients, metric=None):
+    """Percentile tier cut-offs of metric for this version of the portfolio; None for the fixed thresholds."""
+    if metric is None:
+        return None
+    from scoring import percentile_cutoffs
+    return percentile_cutoffs(tier_sketch(path, version, clients, metric))
+
+
+def tiered(path, version, clients, metric=None):
+    """scored() frames with Priority Tier by portfolio percentile of metric, plus the cut-offs.
+
+    With metric None the fixed thresholds from the spec are kept.
+    """
+    df_results, df_maturity = scored(path, version, clients)
+    if metric is None:
+        return df_results, df_maturity, None
+    from scoring import metric_values, tiers_for
+    cutoffs = tier_cutoffs(path, version, clients, metric)
+    df_results = df_results.assign(**{"Priority Tier": tiers_for(metric_values(df_results, metric), cutoffs)})
+    return df_results, df_maturity, cutoffs
+
+
+def _cached(path, name, version, clients, build, patch):
+    store = get_store(path)
+    cached = _derived.get((path, name))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    # Sessions arriving together wait for one pass instead of each doing it
+    with _build_locks[path]:
+        cached = _derived.get((path, name))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        changes = store.changes_between(cached[0], version) if cached is not None else None
+        value = patch(cached[1], changes) if changes else None
+        if value is None:
+            value = build(store, version, clients)
+        _derived[(path, name)] = (version, value)
+        return value
+
+
+def _validate(clients):
+    from validation import validate_clients
+    return validate_clients(clients)
+
+
+def _score(store, version, clients):
+    # A current Arrow copy is scored straight off the memory map, a version
+    # loaded from disk from the codes validation computed; otherwise fall
+    # back to the parsed JSON records
+    if os.path.exists(store.arrow_path):
+        try:
+            from columnar import read_arrow, score_table
+            arrow_version, table = read_arrow(store.arrow_path)
+        except Exception:
+            # Unreadable here (corrupt, or no pyarrow); the store drops it at its next load
+            arrow_version = None
+        if arrow_version == version:
+            return score_table(table)
+    encoded = store.encoded(version)
+    if encoded is not None:
+        from scoring import result_frames, score_encoded
+        return result_frames(encoded["names"], score_encoded(encoded["codes"], encoded["spend"]))
+    from scoring import score_clients
+    return score_clients(clients)
+
+
+def _patch_frames(frames, changes):
+    # Score only the changed clients and splice their rows into new frames;
+    # the cached frames of earlier versions stay untouched
+    import pandas as pd
+    from scoring import score_clients
+    df_results, df_maturity = frames
+    for change in changes:
+        new_rows = score_clients([change.new]) if change.new is not None else (None, None)
+        skip = change.position + (change.old is not None)
+        df_results, df_maturity = (
+            pd.concat([df.iloc[:change.position], new, df.iloc[skip:]], ignore_index=True)
+            for df, new in zip((df_results, df_maturity), new_rows)
+        )
+    return df_results, df_maturity
+
+
+def _patch_sketch(sketch, changes, metric):
+    # Quantile sketches cannot forget a value, so only pure inserts are
+    # folded in; an edit or delete rebuilds the sketch
+    if any(change.old is not None for change in changes):
+        return None
+    from scoring import metric_values, score_record
+    sketch = sketch.copy()
+    for change in changes:
+        row, _ = score_record(change.new)
+        sketch.update(metric_values(row, metric))
+    return sketch
+
+
+def _patch_aggregate(aggregate, changes):
+    aggregate = aggregate.copy()
+    for change in changes:
+        if change.old is not None:
+            aggregate.remove(change.old)
+        if change.new is not None:
+            aggregate.add(change.new)
+    return aggregate
+
+
+def warm_up(path):
+    """Import the dashboard's heavy modules and score the stored portfolio into the cache."""
+    global warmup_seconds
+    start = time.perf_counter()
+    import altair
+    import pandas
+    import scoring
+    version, clients = get_store(path).read()
+    scored(path, version, clients)
+    warmup_seconds = time.perf_counter() - start
+    return warmup_seconds
@@ -0,0 +1,180 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+
+# On-demand profiling of one dashboard run.
+#
+# An admin arms a capture; the next full script run of that session is run
+# under cProfile with tracemalloc tracing, and the result is kept in
+# PROFILE_DIR as <id>.prof (pstats dump, for snakeviz / pstats) plus
+# <id>.json with the portfolio size, session id, wall time, peak traced
+# memory, the top functions by cumulative time and the top allocation sites.
+#
+# cProfile only sees the session's own script thread, but tracemalloc traces
+# the whole process, so allocations of sessions running at the same time are
+# included. Captures of several sessions can overlap: tracing is reference
+# counted and only stopped when the last capture that needed it ends.
+# Fragment-only reruns don't run the script top to bottom and are not
+# captured; the capture waits for the next full run.
+#
+# The admin panel is shown only when ADMIN_TOKEN is set in the environment
+# and the page is opened with ?admin=<token>.
+
+PROFILE_DIR = "profiles"
+TOP_N = 25
+TRACE_FRAMES = 5
+
+ARMED_KEY = "profile_next_run"
+_SKIP_KEY = "_profile_skip_run"
+_ACTIVE_KEY = "_profile_capture"
+
+# Running captures, and whether tracing was started by them (not by someone else)
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_ours = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_ours
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _tracing_ours = not tracemalloc.is_tracing()
+            if _tracing_ours:
+                tracemalloc.start(TRACE_FRAMES)
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_ours:
+            tracemalloc.stop()
+
+
+class Capture:
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.start_time = None
+
+    def start(self):
+        _acquire_tracing()
+        tracemalloc.reset_peak()
+        self.start_time = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        elapsed = time.perf_counter() - self.start_time
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            _release_tracing()
+        return elapsed, peak, snapshot
+
+
+# --- Script hooks ---
+def arm(session_state):
+    """on_change of the admin toggle: skip the toggle's own rerun, capture the one after."""
+    session_state[_SKIP_KEY] = session_state.get(ARMED_KEY, False)
+
+
+def begin(session_state, session_id=None, portfolio_size=None, app=None):
+    """Call at the top of the script: starts a capture if one is armed."""
+    # A capture left running by a run that stopped early (st.rerun) is kept as partial
+    finish(session_state, session_id, portfolio_size, app, partial=True)
+    if not session_state.get(ARMED_KEY) or session_state.pop(_SKIP_KEY, False):
+        return
+    session_state[ARMED_KEY] = False
+    capture = Capture()
+    session_state[_ACTIVE_KEY] = capture
+    capture.start()
+
+
+def finish(session_state, session_id=None, portfolio_size=None, app=None, partial=False, directory=PROFILE_DIR):
+    """Call at the end of the script: stores the capture begin() started, if any."""
+    capture = session_state.pop(_ACTIVE_KEY, None)
+    if capture is None:
+        return None
+    elapsed, peak, snapshot = capture.stop()
+    return save(capture.profiler, snapshot, {
+        "app": app,
+        "session_id": session_id,
+        "portfolio_size": portfolio_size,
+        "seconds": elapsed,
+        "peak_traced_bytes": peak,
+        "partial": partial,
+    }, directory)
+
+
+# --- Storage ---
+def save(profiler, snapshot, meta, directory=PROFILE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    # Two captures of one session can end within the same second
+    session = (meta.get("session_id") or "session")[:8]
+    capture_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{session}-{uuid.uuid4().hex[:6]}"
+    profiler.dump_stats(os.path.join(directory, capture_id + ".prof"))
+    record = {
+        "id": capture_id,
+        "timestamp": time.time(),
+        **meta,
+        "functions": top_functions(profiler),
+        "allocations": top_allocations(snapshot),
+    }
+    with open(os.path.join(directory, capture_id + ".json"), "w") as f:
+        json.dump(record, f, indent=1)
+    return record
+
+
+def top_functions(profiler, limit=TOP_N):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{name} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "own_s": own,
+            "cumulative_s": cumulative,
+        })
+    rows.sort(key=lambda row: row["cumulative_s"], reverse=True)
+    return rows[:limit]
+
+
+def top_allocations(snapshot, limit=TOP_N):
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    return [{
+        "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+        "kib": stat.size / 1024,
+        "blocks": stat.count,
+    } for stat in snapshot.statistics("lineno")[:limit]]
+
+
+def captures(directory=PROFILE_DIR):
+    """Stored capture summaries, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    records = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), "r") as f:
+                records.append(json.load(f))
+    return sorted(records, key=lambda record: record["timestamp"], reverse=True)
+
+
+def profile_path(capture_id, directory=PROFILE_DIR):
+    return os.path.join(directory, capture_id + ".prof")
+
+
+def is_admin(query_params):
+    token = os.environ.get("ADMIN_TOKEN")
+    return bool(token) and query_params.get("admin") == token
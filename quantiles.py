@@ -0,0 +1,128 @@
+import math
+
+import numpy as np
+
+# KLL quantile sketch (Karnin, Lang, Liberty) for portfolio percentiles.
+#
+# Items live in levels; an item at level h stands for 2**h original values.
+# When a level grows past its capacity it is sorted and every other item
+# (random offset) is promoted to the next level, so memory stays around
+# k * 3 items whatever the portfolio size, and the rank error is about
+# 1.7 / k. Sketches of different shards merge by concatenating their levels
+# and compacting, which gives the same guarantees as one sketch over all data.
+#
+# KLL has no deletions: callers rebuild the sketch when clients are removed
+# or changed, and only fold in new clients incrementally.
+
+DEFAULT_K = 200
+_C = 2 / 3
+
+
+class KllSketch:
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._buffer = []
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_values(cls, values, k=DEFAULT_K, seed=None):
+        sketch = cls(k, seed)
+        sketch.update_many(values)
+        return sketch
+
+    def copy(self):
+        sketch = KllSketch(self.k)
+        sketch.n = self.n
+        sketch.levels = list(self._flushed().levels)
+        sketch._rng = np.random.default_rng(self._rng.integers(2 ** 32))
+        return sketch
+
+    # --- Updates ---
+    def update(self, value):
+        self._buffer.append(float(value))
+        self.n += 1
+        if len(self._buffer) >= self.k:
+            self._flushed()
+
+    def update_many(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        self._flushed()
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other):
+        """Fold another sketch (e.g. another shard's) into this one."""
+        self._flushed()
+        other = other._flushed()
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _flushed(self):
+        if self._buffer:
+            self.levels[0] = np.concatenate([self.levels[0], self._buffer])
+            self._buffer = []
+            self._compress()
+        return self
+
+    def _capacity(self, h):
+        depth = len(self.levels) - 1 - h
+        return max(2, math.ceil(self.k * _C ** depth))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind; half of the rest moves up
+                odd = len(items) % 2
+                offset = self._rng.integers(2)
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[odd + offset::2]])
+                self.levels[h] = items[:odd]
+            h += 1
+
+    # --- Queries ---
+    def _weighted(self):
+        self._flushed()
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Approximate value at fraction q (0..1) of the sketched values."""
+        if not self.n:
+            return None
+        items, cumulative = self._weighted()
+        position = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(items[min(position, len(items) - 1)])
+
+    def rank(self, value):
+        """Approximate fraction of sketched values <= value."""
+        if not self.n:
+            return 0.0
+        items, cumulative = self._weighted()
+        position = np.searchsorted(items, value, side="right")
+        return float(cumulative[position - 1] / cumulative[-1]) if position else 0.0
+
+    # --- Persistence ---
+    def to_dict(self):
+        self._flushed()
+        return {"k": self.k, "n": self.n, "levels": [level.tolist() for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.levels = [np.asarray(level, dtype=float) for level in data["levels"]]
+        return sketch
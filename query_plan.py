@@ -0,0 +1,264 @@
+import json
+import re
+
+import pandas as pd
+
+from scoring import AI_CATEGORIES, AI_ROADMAPS, INPUT_COLUMNS, LEVELS, TIERS, metric_values, score_clients
+
+# Schema-only questions about the portfolio.
+#
+# Rather than pasting the portfolio into the prompt, the model is shown the
+# column schema (names, meaning, category values) and asked to answer with a
+# JSON query plan: filters, group-by with an aggregate, sort, top-N and the
+# columns to show. The plan is validated against the schema and executed
+# locally with pandas on the scored portfolio, so the prompt has the same
+# size for 10 or 100,000 clients and the numbers in the answer are exact.
+#
+# ask() takes the model call as a function of the chat messages, so the
+# planner and executor run offline with canned responses as well as with
+# the OpenAI client.
+
+CATEGORIES = {
+    **LEVELS,
+    "Priority Tier": TIERS,
+    "AI Category": AI_CATEGORIES,
+    "AI Roadmap": AI_ROADMAPS,
+}
+NUMBERS = ["R&D Spend", "Estimated Revenue Opportunity", "Total Score"]
+COLUMNS = {
+    "Client": "client name",
+    "R&D Spend": "annual R&D spend in USD",
+    "Footprint": "global footprint",
+    "TA Focus": "therapeutic area focus",
+    "Pipeline": "pipeline complexity",
+    "Digital Maturity": "digital maturity",
+    "Tech Maturity": "clinical tech maturity",
+    "Data Platform": "data platform maturity",
+    "Data Products": "data products capability",
+    "AI Appetite": "GenAI appetite",
+    "AI Maturity": "GenAI maturity",
+    "AI Adoption": "GenAI adoption",
+    "Estimated Revenue Opportunity": "estimated revenue opportunity for us in USD",
+    "Priority Tier": "priority tier of the opportunity",
+    "Total Score": "opportunity score (0 to 1)",
+    "AI Category": "AI/GenAI opportunity category",
+    "AI Roadmap": "recommended AI roadmap",
+}
+OPS = ["==", "!=", "in", "not in", ">", ">=", "<", "<=", "contains"]
+AGGREGATES = ["count", "sum", "mean", "min", "max"]
+MAX_LIMIT = 1000
+
+
+class PlanError(ValueError):
+    pass
+
+
+# --- Portfolio table ---
+def portfolio_table(clients, df_results=None, df_maturity=None):
+    """The table plans run against: profiles plus scores, one row per client.
+
+    Pass scored() frames for clients to reuse them; otherwise they are scored here.
+    """
+    if df_results is None:
+        df_results, df_maturity = score_clients(clients)
+    table = pd.DataFrame(clients, columns=INPUT_COLUMNS)
+    table["Estimated Revenue Opportunity"] = df_results["Estimated Revenue Opportunity"].to_numpy()
+    table["Priority Tier"] = pd.Categorical(df_results["Priority Tier"], categories=TIERS)
+    table["Total Score"] = metric_values(df_results, "Total Score").to_numpy()
+    # Category and roadmap are two labellings of the same AI band
+    ai = df_maturity["AI Roadmap"].cat.codes.to_numpy()
+    table["AI Category"] = pd.Categorical.from_codes(ai, AI_CATEGORIES)
+    table["AI Roadmap"] = pd.Categorical.from_codes(ai, AI_ROADMAPS)
+    for col in LEVELS:
+        table[col] = pd.Categorical(table[col], categories=LEVELS[col])
+    return table[list(COLUMNS)]
+
+
+# --- Prompt ---
+def schema_prompt(question):
+    """Chat messages asking the model for a plan; independent of the portfolio size."""
+    schema = []
+    for col, meaning in COLUMNS.items():
+        if col in CATEGORIES:
+            kind = "one of " + ", ".join(json.dumps(v) for v in CATEGORIES[col])
+        elif col in NUMBERS:
+            kind = "number"
+        else:
+            kind = "text"
+        schema.append(f"- {json.dumps(col)}: {meaning}; {kind}")
+    system = f"""You translate questions about a portfolio of pharma R&D clients into a JSON query plan.
+You never see the data; a program runs your plan on a table with one row per client and these columns:
+{chr(10).join(schema)}
+
+Reply with one JSON object only, with these keys (omit the ones you don't need):
+{{
+  "filters": [{{"column": <column>, "op": one of {json.dumps(OPS)}, "value": <value or list for in/not in>}}],
+  "group_by": [<columns>],
+  "aggregate": {{"column": <column>, "func": one of {json.dumps(AGGREGATES)}}},
+  "sort": [{{"column": <a column of the answer: a group_by column or "value" when aggregating, else a shown column>, "descending": true}}],
+  "limit": <top N, at most {MAX_LIMIT}>,
+  "columns": [<columns to show when not grouping>],
+  "explanation": <one sentence on how the plan answers the question>
+}}
+Filters are combined with AND. Use exact category values."""
+    return [{"role": "system", "content": system}, {"role": "user", "content": question}]
+
+
+# --- Plans ---
+def parse_plan(text):
+    """Parse and validate a model reply into a plan dict; raises PlanError."""
+    match = re.search(r"\{.*\}", text, re.S)
+    if not match:
+        raise PlanError("the model did not return a JSON plan")
+    try:
+        raw = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise PlanError(f"the plan is not valid JSON: {e}") from None
+    if not isinstance(raw, dict):
+        raise PlanError("the plan must be a JSON object")
+    unknown = set(raw) - {"filters", "group_by", "aggregate", "sort", "limit", "columns", "explanation"}
+    if unknown:
+        raise PlanError(f"unknown plan keys: {', '.join(sorted(unknown))}")
+
+    plan = {
+        "filters": [_check_filter(f) for f in _list(raw, "filters")],
+        "group_by": [_check_column(c) for c in _list(raw, "group_by")],
+        "aggregate": None,
+        "sort": [],
+        "limit": None,
+        "columns": [_check_column(c) for c in _list(raw, "columns")],
+        "explanation": str(raw.get("explanation", "")),
+    }
+    if raw.get("aggregate") is not None:
+        aggregate = raw["aggregate"]
+        if not isinstance(aggregate, dict) or aggregate.get("func") not in AGGREGATES:
+            raise PlanError(f"aggregate needs a func out of {', '.join(AGGREGATES)}")
+        column = _check_column(aggregate.get("column", "Client"))
+        if aggregate["func"] != "count" and column not in NUMBERS:
+            raise PlanError(f"cannot {aggregate['func']} the non-numeric column {column!r}")
+        plan["aggregate"] = {"column": column, "func": aggregate["func"]}
+    if plan["group_by"] and plan["aggregate"] is None:
+        plan["aggregate"] = {"column": "Client", "func": "count"}
+    # Sorting happens on the answer, so only its columns can be sort keys
+    if plan["aggregate"] is not None:
+        output = plan["group_by"] + ["value"]
+    elif plan["columns"]:
+        output = ["Client"] + plan["columns"]
+    else:
+        output = list(COLUMNS)
+    for item in _list(raw, "sort"):
+        if not isinstance(item, dict):
+            raise PlanError("sort entries must be objects")
+        column = item.get("column")
+        if column not in output:
+            raise PlanError(f"cannot sort by {column!r}; the answer has the columns {', '.join(output)}")
+        plan["sort"].append({"column": column, "descending": bool(item.get("descending", False))})
+    if raw.get("limit") is not None:
+        limit = raw["limit"]
+        if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= MAX_LIMIT:
+            raise PlanError(f"limit must be a whole number from 1 to {MAX_LIMIT}")
+        plan["limit"] = limit
+    return plan
+
+
+def _list(raw, key):
+    value = raw.get(key) or []
+    if not isinstance(value, list):
+        raise PlanError(f"{key} must be a list")
+    return value
+
+
+def _check_column(column):
+    if column not in COLUMNS:
+        raise PlanError(f"unknown column {column!r}")
+    return column
+
+
+def _check_filter(item):
+    if not isinstance(item, dict):
+        raise PlanError("filters must be objects")
+    column = _check_column(item.get("column"))
+    op = item.get("op")
+    if op not in OPS:
+        raise PlanError(f"unknown operator {op!r}")
+    value = item.get("value")
+    values = value if op in ("in", "not in") else [value]
+    if op in ("in", "not in") and not isinstance(value, list):
+        raise PlanError(f"{op!r} needs a list of values")
+    if op == "contains" and not isinstance(value, str):
+        raise PlanError("'contains' needs a text value")
+    if column in CATEGORIES:
+        # Ordering operators compare level positions, e.g. Tech Maturity >= "Developing"
+        for v in values:
+            if op != "contains" and v not in CATEGORIES[column]:
+                raise PlanError(f"{v!r} is not a value of {column!r}")
+    elif column in NUMBERS:
+        if op == "contains" or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            raise PlanError(f"{column!r} compares with numbers")
+    elif op in (">", ">=", "<", "<="):
+        raise PlanError(f"cannot order {column!r}")
+    elif not all(isinstance(v, str) for v in values):
+        raise PlanError(f"{column!r} compares with text")
+    return {"column": column, "op": op, "value": value}
+
+
+def execute(plan, table):
+    """Run a validated plan on portfolio_table(); returns the answer frame."""
+    mask = pd.Series(True, index=table.index)
+    for f in plan["filters"]:
+        column, op, value = table[f["column"]], f["op"], f["value"]
+        if f["column"] in CATEGORIES and op in (">", ">=", "<", "<="):
+            # Compare level positions
+            column, value = column.cat.codes, CATEGORIES[f["column"]].index(value)
+        if op == "==":
+            mask &= column == value
+        elif op == "!=":
+            mask &= column != value
+        elif op == "in":
+            mask &= column.isin(value)
+        elif op == "not in":
+            mask &= ~column.isin(value)
+        elif op == "contains":
+            mask &= column.astype(str).str.contains(str(value), case=False, regex=False)
+        else:
+            mask &= {">": column > value, ">=": column >= value, "<": column < value, "<=": column <= value}[op]
+    result = table[mask]
+
+    aggregate = plan["aggregate"]
+    if aggregate is not None:
+        name = "value" if not plan["group_by"] else f"{aggregate['func']} of {aggregate['column']}"
+        if plan["group_by"]:
+            grouped = result.groupby(plan["group_by"], observed=True)[aggregate["column"]]
+            result = getattr(grouped, aggregate["func"])().rename(name).reset_index()
+        else:
+            result = pd.DataFrame({name: [getattr(result[aggregate["column"]], aggregate["func"])()]})
+        sort = [{**s, "column": name} if s["column"] == "value" else s for s in plan["sort"]]
+    else:
+        sort = plan["sort"]
+        if plan["columns"]:
+            keep = list(dict.fromkeys(["Client"] + plan["columns"]))
+            result = result[keep]
+
+    if sort:
+        result = result.sort_values([s["column"] for s in sort], ascending=[not s["descending"] for s in sort],
+                                    kind="stable")
+    if plan["limit"] is not None:
+        result = result.head(plan["limit"])
+    return result.reset_index(drop=True)
+
+
+def ask(question, table, complete):
+    """Plan with the model (complete(messages) -> reply text) and execute locally.
+
+    Returns (plan, answer frame).
+    """
+    plan = parse_plan(complete(schema_prompt(question)))
+    return plan, execute(plan, table)
+
+
+def openai_complete(client, model="gpt-4"):
+    """A complete() function backed by an OpenAI client."""
+    def complete(messages):
+        response = client.chat.completions.create(model=model, messages=messages, temperature=0, max_tokens=400)
+        return response.choices[0].message.content
+    return complete
@@ -0,0 +1,146 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from scoring import AI_CATEGORIES, INPUT_COLUMNS, LEVELS, TIERS, score_arrays, score_record
+
+# Revenue/spend rollups over the scored portfolio. Every client falls into one
+# cell of a 3x3x3x3x3 cube (footprint, TA focus, pipeline, tier, AI category),
+# so the cube is built in one pass and any combination of dimensions is a sum
+# over at most 243 cells, cached per combination until the portfolio changes.
+#
+# MaturityGrids does the same for the maturity heatmaps: client count and
+# revenue per level pair of two maturity columns, binned from the level codes
+# with np.bincount, so a chart gets at most a 3x3 grid whatever the size of
+# the portfolio. Grids only grow: add_scored() folds in newly scored clients.
+
+DIMENSIONS = {
+    "Footprint": LEVELS["Footprint"],
+    "TA Focus": LEVELS["TA Focus"],
+    "Pipeline": LEVELS["Pipeline"],
+    "Priority Tier": TIERS,
+    "AI Category": AI_CATEGORIES,
+}
+MEASURES = ["Clients", "Revenue Opportunity", "R&D Spend"]
+
+# Heatmap pairs: (rows, columns) of the grid
+MATURITY_PAIRS = [
+    ("Data Platform", "Tech Maturity"),
+    ("AI Appetite", "AI Adoption"),
+    ("Digital Maturity", "Data Products"),
+    ("AI Maturity", "AI Adoption"),
+]
+GRID_MEASURES = ["Clients", "Revenue Opportunity"]
+
+
+class RollupCube:
+    def __init__(self):
+        shape = tuple(len(values) for values in DIMENSIONS.values())
+        self.cells = {measure: np.zeros(shape) for measure in MEASURES}
+        self._cuboids = {}
+
+    @classmethod
+    def from_clients(cls, clients, tiers=None):
+        """Cube of the clients; tiers are Priority Tier codes to use instead of the fixed cut-offs."""
+        cube = cls()
+        if clients:
+            df_input = pd.DataFrame(clients, columns=INPUT_COLUMNS)
+            scored = score_arrays(df_input)
+            index = (scored["codes"]["Footprint"], scored["codes"]["TA Focus"], scored["codes"]["Pipeline"],
+                     scored["tier"] if tiers is None else np.asarray(tiers), scored["ai"])
+            np.add.at(cube.cells["Clients"], index, 1)
+            np.add.at(cube.cells["Revenue Opportunity"], index, scored["revenue"])
+            np.add.at(cube.cells["R&D Spend"], index, scored["spend"])
+        return cube
+
+    def copy(self):
+        cube = RollupCube()
+        cube.cells = {measure: cells.copy() for measure, cells in self.cells.items()}
+        return cube
+
+    def add(self, client):
+        self._apply(client, 1)
+
+    def remove(self, client):
+        self._apply(client, -1)
+
+    def _apply(self, client, sign):
+        row, ai = score_record(client)
+        index = (
+            DIMENSIONS["Footprint"].index(client["Footprint"]),
+            DIMENSIONS["TA Focus"].index(client["TA Focus"]),
+            DIMENSIONS["Pipeline"].index(client["Pipeline"]),
+            TIERS.index(row["Priority Tier"]),
+            ai,
+        )
+        self.cells["Clients"][index] += sign
+        self.cells["Revenue Opportunity"][index] += sign * row["Estimated Revenue Opportunity"]
+        self.cells["R&D Spend"][index] += sign * client["R&D Spend"]
+        self._cuboids.clear()
+
+    def cuboid(self, dims):
+        """Measures summed over every dimension not in dims, keyed by dimension order."""
+        dims = tuple(d for d in DIMENSIONS if d in dims)
+        if dims not in self._cuboids:
+            axes = tuple(i for i, d in enumerate(DIMENSIONS) if d not in dims)
+            self._cuboids[dims] = {m: cells.sum(axis=axes) for m, cells in self.cells.items()}
+        return dims, self._cuboids[dims]
+
+    def rollup(self, dims):
+        """One row per populated combination of dims with sum, mean and count measures."""
+        dims, cuboid = self.cuboid(dims)
+        rows = []
+        for key in itertools.product(*(range(len(DIMENSIONS[d])) for d in dims)):
+            count = cuboid["Clients"][key]
+            if not count:
+                continue
+            revenue = cuboid["Revenue Opportunity"][key]
+            spend = cuboid["R&D Spend"][key]
+            rows.append({
+                **{d: DIMENSIONS[d][k] for d, k in zip(dims, key)},
+                "Clients": int(count),
+                "Total Revenue Opportunity": revenue,
+                "Avg Revenue Opportunity": revenue / count,
+                "Total R&D Spend": spend,
+                "Avg R&D Spend": spend / count,
+            })
+        return pd.DataFrame(rows, columns=list(dims) + [
+            "Clients", "Total Revenue Opportunity", "Avg Revenue Opportunity",
+            "Total R&D Spend", "Avg R&D Spend",
+        ])
+
+    def lookup(self, **members):
+        """Measures for one slice, e.g. lookup(Footprint="Global", **{"Priority Tier": "HIGH"})."""
+        dims, cuboid = self.cuboid(members)
+        key = tuple(DIMENSIONS[d].index(members[d]) for d in dims)
+        return {m: float(values[key]) for m, values in cuboid.items()}
+
+
+class MaturityGrids:
+    def __init__(self, pairs=MATURITY_PAIRS):
+        self.pairs = list(pairs)
+        self.cells = {pair: {m: np.zeros((len(LEVELS[pair[0]]), len(LEVELS[pair[1]]))) for m in GRID_MEASURES}
+                      for pair in self.pairs}
+        self.count = 0
+
+    def add_scored(self, codes, revenue):
+        """Fold in clients from score_arrays() codes and revenue."""
+        for (row, col), measures in self.cells.items():
+            shape = measures["Clients"].shape
+            bins = codes[row] * shape[1] + codes[col]
+            size = shape[0] * shape[1]
+            measures["Clients"] += np.bincount(bins, minlength=size).reshape(shape)
+            measures["Revenue Opportunity"] += np.bincount(bins, weights=revenue, minlength=size).reshape(shape)
+        self.count += len(revenue)
+
+    def grid(self, pair):
+        """The pair's grid as one row per cell (row level, column level, measures)."""
+        row, col = pair
+        measures = self.cells[pair]
+        rows, cols = np.indices(measures["Clients"].shape)
+        return pd.DataFrame({
+            row: np.asarray(LEVELS[row], dtype=object)[rows.ravel()],
+            col: np.asarray(LEVELS[col], dtype=object)[cols.ravel()],
+            **{m: measures[m].ravel() for m in GRID_MEASURES},
+        })
@@ -0,0 +1,289 @@
+import functools
+import itertools
+import json
+import operator
+import os
+
+import numpy as np
+import pandas as pd
+
+# Opportunity scoring compiled from the declarative rules in scoring_rules.json.
+#
+# The spec lists the weighted factors (input column, weight, level -> score),
+# the AI/GenAI bands (minimum summed score, weight multiplier, category), the
+# component order, the tier thresholds and named text variants for the
+# roadmap/action recommendations. compile_spec() turns it into a Scorer once:
+# every input column is encoded to small integer codes, and component values
+# and total scores come from tables built with the same Python float
+# arithmetic as the original iterrows() loop, so results match it exactly.
+#
+# The optional "effort" section estimates the consultant effort a client
+# takes (base plus weeks per level of some profile columns), for capacity
+# planning in allocation.py.
+#
+# Tiers normally use the fixed "above" cut-offs. Each tier may also name a
+# portfolio percentile; percentile_cutoffs() turns a quantile sketch of
+# Total Score or revenue (see quantiles.py) into data-driven cut-offs.
+
+SPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_rules.json")
+
+# Metrics percentile tiers can be based on
+TIER_METRICS = ["Total Score", "Estimated Revenue Opportunity"]
+
+
+def load_spec(path=SPEC_PATH, variant="standard"):
+    """Read a rules file and resolve one of its text variants into the spec."""
+    with open(path, "r") as f:
+        spec = json.load(f)
+    texts = spec.pop("variants")[variant]
+    spec["roadmaps"] = texts["roadmaps"]
+    spec["actions"] = texts.get("actions")
+    return spec
+
+
+def compile_spec(spec):
+    return Scorer(spec)
+
+
+@functools.lru_cache(maxsize=None)
+def get_scorer(variant="standard", path=SPEC_PATH):
+    return compile_spec(load_spec(path, variant))
+
+
+def round_thousands(values):
+    """Element-wise equivalent of Python's round(x, -3) (round half to even)."""
+    values = np.asarray(values, dtype=float)
+    q = np.floor(values / 1000)
+    rem = values - q * 1000
+    # values / 1000 can itself round across an integer; pull q back in range
+    low = rem < 0
+    q[low] -= 1
+    rem[low] += 1000
+    high = rem >= 1000
+    q[high] += 1
+    rem[high] -= 1000
+    up = (rem > 500) | ((rem == 500) & (q % 2 == 1))
+    rounded = (q + up) * 1000
+    # Beyond 2**52 the remainder is no longer exact; defer to Python there
+    huge = np.abs(values) >= 2 ** 52
+    if huge.any():
+        rounded[huge] = [round(v, -3) for v in values[huge].tolist()]
+    return rounded
+
+
+class Scorer:
+    def __init__(self, spec):
+        ai = spec["ai"]
+        self.factors = [(f["component"], f["column"], f["levels"], f["weight"]) for f in spec["factors"]]
+        self.ai_component = ai["component"]
+        self.ai_columns = list(ai["columns"])
+        self.ai_bands = ai["bands"]
+        self.components = list(spec["components"])
+        self.tiers = [tier["name"] for tier in spec["tiers"]]
+        self.tier_thresholds = [tier["above"] for tier in spec["tiers"]]
+        self.tier_percentiles = [tier.get("percentile") for tier in spec["tiers"]]
+        self.ai_categories = [band["category"] for band in ai["bands"]]
+        self.roadmaps = list(spec["roadmaps"])
+        self.actions = list(spec["actions"]) if spec.get("actions") else None
+
+        # Levels of every categorical input column, in code order
+        self.levels = {col: list(levels) for _, col, levels, _ in self.factors}
+        self.levels.update({col: list(ai["levels"]) for col in self.ai_columns})
+        self.input_columns = ["Client", "R&D Spend"] + list(self.levels)
+        self.result_columns = ["Client", "Estimated Revenue Opportunity", "Priority Tier"] + self.components
+        self._code_of = {col: {key: i for i, key in enumerate(levels)} for col, levels in self.levels.items()}
+
+        # Effort per level code of each effort column, on top of the base
+        effort = spec.get("effort") or {"unit": None, "base": 0, "columns": {}}
+        self.effort_unit = effort["unit"]
+        self._effort_base = effort["base"]
+        self._effort_values = {col: np.array([weeks[level] for level in self.levels[col]])
+                               for col, weeks in effort["columns"].items()}
+
+        # Component value per factor code: weight * score / scale
+        scale = spec["factor_scale"]
+        self._component_values = {
+            name: np.array([weight * score / scale for score in levels.values()])
+            for name, _, levels, weight in self.factors
+        }
+        self._ai_weights = [ai["weight"] * band["multiplier"] for band in self.ai_bands]
+
+        # AI band per combination of AI column codes
+        ai_scores = list(ai["levels"].values())
+        self._ai_band = np.array([
+            self._band(sum(combo))
+            for combo in itertools.product(ai_scores, repeat=len(self.ai_columns))
+        ]).reshape((len(ai_scores),) * len(self.ai_columns))
+
+        self._totals = self._build_total_table()
+
+    def _band(self, ai_total):
+        for i, band in enumerate(self.ai_bands):
+            if band["min_total"] is None or ai_total >= band["min_total"]:
+                return i
+        raise ValueError(f"no AI band covers a score of {ai_total}")
+
+    def _build_total_table(self):
+        # total_score for every (factor codes..., AI band) combination, summed
+        # with builtin sum() in component order exactly like the loop
+        names = [name for name, _, _, _ in self.factors]
+        shape = tuple(len(levels) for _, _, levels, _ in self.factors) + (len(self._ai_weights),)
+        table = np.empty(shape)
+        for codes in itertools.product(*(range(n) for n in shape)):
+            values = {name: float(self._component_values[name][code]) for name, code in zip(names, codes)}
+            values[self.ai_component] = self._ai_weights[codes[-1]]
+            table[codes] = sum(values[name] for name in self.components)
+        return table
+
+    def _tier_codes(self, total_score):
+        # Walk from the lowest threshold up so the highest matching tier wins
+        tier = np.full(np.shape(total_score), len(self.tiers) - 1)
+        for i in reversed(range(len(self.tiers))):
+            if self.tier_thresholds[i] is not None:
+                tier = np.where(total_score > self.tier_thresholds[i], i, tier)
+        return tier
+
+    # --- Percentile tiers ---
+    def metric_values(self, results, metric):
+        """Values of a tier metric from df_results or one score_record() row."""
+        if metric == "Total Score":
+            # Left-to-right in component order, exactly like builtin sum()
+            return functools.reduce(operator.add, (results[name] for name in self.components))
+        return results[metric]
+
+    def percentile_cutoffs(self, sketch):
+        """Tier cut-offs at the spec's portfolio percentiles of a sketched metric."""
+        return [None if p is None else sketch.quantile(p) for p in self.tier_percentiles]
+
+    def tiers_for(self, values, cutoffs):
+        """Priority Tier per value for data-driven cut-offs; a value on a cut-off joins that tier."""
+        values = np.asarray(values, dtype=float)
+        tier = np.full(values.shape, len(self.tiers) - 1)
+        for i in reversed(range(len(self.tiers))):
+            if cutoffs[i] is not None:
+                tier = np.where(values >= cutoffs[i], i, tier)
+        return pd.Categorical.from_codes(tier, self.tiers)
+
+    # --- Vectorized scoring ---
+    def encode(self, df_input):
+        """Map every categorical input column to its level codes; raise KeyError on unknown values."""
+        return {col: _codes(df_input[col], levels) for col, levels in self.levels.items()}
+
+    def score_arrays(self, df_input):
+        """Score a frame of client profiles into plain arrays (codes, components, totals)."""
+        return self.score_encoded(self.encode(df_input), np.asarray(df_input["R&D Spend"], dtype=float))
+
+    def score_encoded(self, codes, spend):
+        """Score already-encoded profiles: codes maps each input column to level codes."""
+        ai = self._ai_band[tuple(codes[col] for col in self.ai_columns)]
+
+        components = {}
+        for name, col, _, _ in self.factors:
+            components[name] = self._component_values[name][codes[col]]
+        components[self.ai_component] = np.asarray(self._ai_weights)[ai]
+
+        total_score = self._totals[tuple(codes[col] for _, col, _, _ in self.factors) + (ai,)]
+        return {
+            "codes": codes,
+            "ai": ai,
+            "components": components,
+            "total_score": total_score,
+            "spend": spend,
+            "revenue": round_thousands(spend * total_score),
+            "tier": self._tier_codes(total_score),
+        }
+
+    def score_frame(self, df_input):
+        """Score a frame of client profiles; returns (df_results, df_maturity)."""
+        return self.result_frames(df_input["Client"].to_numpy(), self.score_arrays(df_input))
+
+    def result_frames(self, clients, scored):
+        """Build (df_results, df_maturity) from client names and score_encoded() output."""
+        df_results = pd.DataFrame({
+            "Client": clients,
+            "Estimated Revenue Opportunity": scored["revenue"],
+            "Priority Tier": pd.Categorical.from_codes(scored["tier"], self.tiers),
+            **{name: scored["components"][name] for name in self.components},
+        })
+        df_maturity = pd.DataFrame({
+            "Client": clients,
+            "AI Roadmap": self.band_labels(scored, "roadmap"),
+        })
+        return df_results, df_maturity
+
+    def band_labels(self, scored, kind):
+        """AI band text per client as a Categorical; kind is "category", "roadmap" or "action"."""
+        labels = {"category": self.ai_categories, "roadmap": self.roadmaps, "action": self.actions}[kind]
+        return pd.Categorical.from_codes(scored["ai"], labels)
+
+    def score_clients(self, clients):
+        """Score a list of client dicts as stored in client_data.json."""
+        return self.score_frame(pd.DataFrame(clients, columns=self.input_columns))
+
+    def iter_scored_chunks(self, clients, chunk_size=50_000):
+        """Yield (df_results, df_maturity) for successive slices of the portfolio."""
+        for start in range(0, len(clients), chunk_size):
+            yield self.score_clients(clients[start:start + chunk_size])
+
+    # --- Effort ---
+    def effort_encoded(self, codes):
+        """Estimated effort per client from encoded profiles (see encode())."""
+        n = len(next(iter(codes.values())))
+        effort = np.full(n, self._effort_base)
+        for col, values in self._effort_values.items():
+            effort = effort + values[codes[col]]
+        return effort
+
+    def effort_record(self, record):
+        return self._effort_base + sum(int(values[self._code_of[col][record[col]]])
+                                       for col, values in self._effort_values.items())
+
+    # --- Single record ---
+    def score_record(self, record):
+        """Score one client dict without pandas; returns the df_results row and its AI band."""
+        codes = {col: self._code_of[col][record[col]] for col in self._code_of}
+        ai = int(self._ai_band[tuple(codes[col] for col in self.ai_columns)])
+        total_score = float(self._totals[tuple(codes[col] for _, col, _, _ in self.factors) + (ai,)])
+        components = {name: float(self._component_values[name][codes[col]]) for name, col, _, _ in self.factors}
+        components[self.ai_component] = self._ai_weights[ai]
+        row = {
+            "Client": record["Client"],
+            "Estimated Revenue Opportunity": round(record["R&D Spend"] * total_score, -3),
+            "Priority Tier": self.tiers[int(self._tier_codes(total_score))],
+            **{name: components[name] for name in self.components},
+        }
+        return row, ai
+
+
+def _codes(series, levels):
+    codes = np.asarray(pd.Categorical(series, categories=levels).codes)
+    if (codes < 0).any():
+        raise KeyError(pd.Series(series)[codes < 0].iloc[0])
+    return codes
+
+
+# Module-level API bound to the standard rules, used across the dashboards
+_default = get_scorer()
+
+LEVELS = _default.levels
+AI_COLUMNS = _default.ai_columns
+COMPONENTS = _default.components
+TIERS = _default.tiers
+AI_CATEGORIES = _default.ai_categories
+AI_ROADMAPS = _default.roadmaps
+INPUT_COLUMNS = _default.input_columns
+RESULT_COLUMNS = _default.result_columns
+
+encode = _default.encode
+score_arrays = _default.score_arrays
+score_encoded = _default.score_encoded
+score_frame = _default.score_frame
+result_frames = _default.result_frames
+score_record = _default.score_record
+effort_encoded = _default.effort_encoded
+effort_record = _default.effort_record
+score_clients = _default.score_clients
+iter_scored_chunks = _default.iter_scored_chunks
+metric_values = _default.metric_values
+percentile_cutoffs = _default.percentile_cutoffs
+tiers_for = _default.tiers_for
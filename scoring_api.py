@@ -0,0 +1,152 @@
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pyarrow as pa
+
+from scoring import AI_CATEGORIES, AI_ROADMAPS, score_frame, score_record
+from validation import check_frame, record_reasons
+
+# Local HTTP scoring service for other internal tools.
+#
+#   python scoring_api.py [--host 127.0.0.1] [--port 8502]
+#
+#   POST /score        one profile as JSON, same fields as the sidebar form
+#   POST /score/batch  a JSON array of profiles, or an Arrow IPC stream
+#                      (Content-Type: application/vnd.apache.arrow.stream);
+#                      the response uses the same format as the request
+#   GET  /health
+#
+# The scoring tables are built once at import, every request thread shares
+# them, and batches are scored in one vectorized pass. Profiles are checked
+# against the stored-record schema (validation.py) first; a bad one gets a
+# 400 with the reasons, for a batch with the index of every bad profile.
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def score_one(profile):
+    row, ai = score_record(profile)
+    row["AI Category"] = AI_CATEGORIES[ai]
+    row["AI Roadmap"] = AI_ROADMAPS[ai]
+    return row
+
+
+def score_batch(df_input):
+    df_results, df_maturity = score_frame(df_input)
+    df_results["AI Roadmap"] = df_maturity["AI Roadmap"]
+    return df_results
+
+
+class InvalidProfile(ValueError):
+    def __init__(self, message, reasons):
+        super().__init__(message)
+        self.reasons = reasons
+
+
+def check_profile(profile):
+    """Why a requested profile cannot be scored; empty if it can."""
+    if not isinstance(profile, dict):
+        return ["expected a JSON object with the profile fields"]
+    return record_reasons(profile)
+
+
+def _reject(invalid):
+    # invalid: {batch index: reasons}
+    first = min(invalid)
+    raise InvalidProfile(f"profile {first}: {'; '.join(invalid[first])}",
+                         [{"index": i, "reasons": reasons} for i, reasons in sorted(invalid.items())])
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path == "/score":
+                profile = json.loads(body)
+                reasons = check_profile(profile)
+                if reasons:
+                    raise InvalidProfile("; ".join(reasons), reasons)
+                self._send_json(200, score_one(profile))
+            elif self.path == "/score/batch":
+                self._score_batch(body)
+            else:
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+        except InvalidProfile as e:
+            self._send_json(400, {"error": str(e), "reasons": e.reasons})
+        except (ValueError, pa.ArrowInvalid) as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            # Always answer; a dropped connection tells the caller nothing
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _score_batch(self, body):
+        if self.headers.get("Content-Type", "").startswith(ARROW_STREAM):
+            df_input = pa.ipc.open_stream(body).read_pandas()
+            bad, reasons, _, _ = check_frame(df_input)
+            if bad.any():
+                _reject(reasons)
+            table = pa.Table.from_pandas(score_batch(df_input), preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            self._send(200, sink.getvalue().to_pybytes(), ARROW_STREAM)
+        else:
+            profiles = json.loads(body)
+            if not isinstance(profiles, list):
+                raise ValueError("expected a JSON array of profiles")
+            invalid = {}
+            for i, profile in enumerate(profiles):
+                reasons = check_profile(profile)
+                if reasons:
+                    invalid[i] = reasons
+            if invalid:
+                _reject(invalid)
+            records = score_batch(pd.DataFrame(profiles)).to_dict("records") if profiles else []
+            self._send_json(200, records)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8502):
+    return ThreadingHTTPServer((host, port), ScoringHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local opportunity scoring API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port)
+    print(f"Scoring API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from collections import Counter
+
+from client_store import client_key
+
+# Typeahead search over client names.
+#
+# Every name is normalized with client_key() and split into padded trigrams
+# ("  ac", " acm", ... for "acme"), and each trigram maps to the set of names
+# containing it. A query only touches the postings of its own trigrams, so
+# lookups stay in the millisecond range for large portfolios. Matches are
+# ranked exact > prefix > substring > trigram overlap (Jaccard), which also
+# tolerates small typos.
+#
+# The index follows the portfolio through add()/remove(). copy() is shallow:
+# the copy and the original share their posting sets until either changes
+# one, which then copies that set once and owns it from there on, so a copy
+# taken for a newer portfolio version never changes the one other sessions
+# are reading and a batch of updates copies each touched set only once.
+# Names are counted per client key, so removing one of two records with the
+# same name (apps 5-9 append without checking) keeps the name searchable.
+
+N = 3
+
+
+def ngrams(key):
+    padded = " " * (N - 1) + key + " "
+    return {padded[i:i + N] for i in range(len(padded) - N + 1)}
+
+
+class NameIndex:
+    def __init__(self):
+        self.names = {}
+        self.counts = {}
+        self.postings = {}
+        # Grams whose posting set no other index shares
+        self._owned = set()
+
+    @classmethod
+    def from_clients(cls, clients):
+        index = cls()
+        for client in clients:
+            key = client_key(client["Client"])
+            index.names[key] = client["Client"]
+            index.counts[key] = index.counts.get(key, 0) + 1
+            for gram in ngrams(key):
+                index.postings.setdefault(gram, set()).add(key)
+        index._owned = set(index.postings)
+        return index
+
+    def copy(self):
+        index = NameIndex()
+        index.names = dict(self.names)
+        index.counts = dict(self.counts)
+        index.postings = dict(self.postings)
+        # Both now share every set; whichever changes one copies it first
+        self._owned = set()
+        return index
+
+    def _posting(self, gram):
+        if gram not in self._owned:
+            self.postings[gram] = set(self.postings.get(gram, ()))
+            self._owned.add(gram)
+        return self.postings[gram]
+
+    def add(self, client):
+        key = client_key(client["Client"])
+        self.names[key] = client["Client"]
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if self.counts[key] > 1:
+            return
+        for gram in ngrams(key):
+            self._posting(gram).add(key)
+
+    def remove(self, client):
+        key = client_key(client["Client"])
+        count = self.counts.get(key, 0)
+        if count > 1:
+            self.counts[key] = count - 1
+            return
+        if not count:
+            return
+        del self.counts[key]
+        del self.names[key]
+        for gram in ngrams(key):
+            keys = self._posting(gram)
+            keys.discard(key)
+            if not keys:
+                del self.postings[gram]
+                self._owned.discard(gram)
+
+    def search(self, query, limit=10):
+        """Up to limit (name, score) pairs, best match first."""
+        query = client_key(query)
+        if not query:
+            return []
+        grams = ngrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        ranked = []
+        for key, overlap in shared.items():
+            score = overlap / (len(grams) + len(key) + 1 - overlap)
+            if key == query:
+                score += 3
+            elif key.startswith(query):
+                score += 2
+            elif query in key:
+                score += 1
+            ranked.append((-score, len(key), key))
+        ranked.sort()
+        return [(self.names[key], -score) for score, _, key in ranked[:limit]]
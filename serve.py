@@ -0,0 +1,29 @@
+import sys
+import threading
+
+from streamlit.web import cli as stcli
+
+import portfolio
+
+# Launch the dashboard with a warm cache:
+#
+#   python serve.py [app.py] [streamlit options...]
+#
+# Runs `streamlit run` in this process and, in a background thread, imports
+# the heavy modules and scores client_data.json into the shared portfolio
+# cache, so the first visitor doesn't pay for loading and scoring.
+
+DATA_FILE = "client_data.json"
+
+
+def main(argv):
+    script = "app.py"
+    if argv and argv[0].endswith(".py"):
+        script, argv = argv[0], argv[1:]
+    threading.Thread(target=portfolio.warm_up, args=(DATA_FILE,), daemon=True).start()
+    sys.argv = ["streamlit", "run", script, *argv]
+    return stcli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,178 @@
+import os
+import pickle
+import sys
+import threading
+import time
+
+# Memory held by browser sessions, and eviction of idle sessions' big state.
+#
+# Every run registers its session with touch(). usage() walks each live
+# session's state and reports the bytes every key holds: objects reachable
+# from one session only count as that session's own memory, objects several
+# sessions point at (the client dicts the store hands out) as shared. The
+# walk runs on a snapshot of the registry, outside its lock, so the other
+# sessions' touch() never waits for it.
+#
+# A session idle for IDLE_AFTER seconds gives up its values of LARGE_BYTES or
+# more. Keys the script rebuilds on every run from the shared store (e.g.
+# app.py's clients) are simply dropped; anything else is spilled to a pickle
+# in SPILL_DIR and put back by the session's next touch(). Eviction runs from
+# whichever session touches the registry, at most every CHECK_EVERY seconds.
+# Sessions the Streamlit runtime no longer lists as active (closed tabs) are
+# dropped along with their spill files.
+
+IDLE_AFTER = 15 * 60
+LARGE_BYTES = 1 << 20
+CHECK_EVERY = 60
+SPILL_DIR = "session_spill"
+
+
+def _underlying(state):
+    # Streamlit wraps the session's SessionState in a fresh SafeSessionState
+    # for every script run; the registry keeps the long-lived object
+    return getattr(state, "_state", state)
+
+
+def _session_active(session_id):
+    from streamlit.runtime import Runtime
+    return not Runtime.exists() or bool(Runtime.instance().is_active_session(session_id))
+
+
+# --- Sizes ---
+def _reachable(value, sizes):
+    """Record id -> size of every object reachable from value into sizes."""
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in sizes:
+            continue
+        module = type(obj).__module__
+        if module.startswith("pandas") and hasattr(obj, "memory_usage"):
+            usage = obj.memory_usage(deep=True)
+            sizes[id(obj)] = int(usage.sum() if hasattr(usage, "sum") else usage)
+        elif module == "numpy" and hasattr(obj, "nbytes"):
+            sizes[id(obj)] = int(obj.nbytes)
+        else:
+            sizes[id(obj)] = sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+            elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+                stack.extend(vars(obj).values())
+    return sizes
+
+
+def object_bytes(value):
+    return sum(_reachable(value, {}).values())
+
+
+class SessionRegistry:
+    def __init__(self, idle_after=IDLE_AFTER, large_bytes=LARGE_BYTES, spill_dir=SPILL_DIR,
+                 check_every=CHECK_EVERY, is_active=_session_active):
+        self.idle_after = idle_after
+        self.large_bytes = large_bytes
+        self.spill_dir = spill_dir
+        self.check_every = check_every
+        self.is_active = is_active
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+
+    def touch(self, session_id, state, reloadable=()):
+        """Mark a session active at the start of its run, restoring anything evicted from it.
+
+        reloadable names keys the script rebuilds every run; eviction drops them.
+        Returns the keys that had been evicted.
+        """
+        state = _underlying(state)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or entry["state"] is not state:
+                entry = self._sessions[session_id] = {"state": state, "evicted": {}}
+            entry["last_seen"] = now
+            entry["reloadable"] = set(reloadable)
+            evicted, entry["evicted"] = entry["evicted"], {}
+            for key, path in evicted.items():
+                if path is not None:
+                    with open(path, "rb") as f:
+                        state[key] = pickle.load(f)
+                    os.remove(path)
+        if now - self._last_check >= self.check_every:
+            self.evict_idle(now)
+        return list(evicted)
+
+    def _live(self):
+        # (session_id, entry, state) for active sessions; closed ones are forgotten
+        live = []
+        for session_id, entry in list(self._sessions.items()):
+            if self.is_active(session_id):
+                live.append((session_id, entry, entry["state"]))
+                continue
+            del self._sessions[session_id]
+            for path in entry["evicted"].values():
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+        return live
+
+    # --- Eviction ---
+    def evict_idle(self, now=None):
+        """Release large values of sessions idle longer than idle_after; returns bytes released."""
+        now = time.monotonic() if now is None else now
+        released = 0
+        with self._lock:
+            self._last_check = now
+            for session_id, entry, state in self._live():
+                if now - entry["last_seen"] < self.idle_after:
+                    continue
+                for key, value in list(state.filtered_state.items()):
+                    if key in entry["evicted"]:
+                        continue
+                    size = object_bytes(value)
+                    if size < self.large_bytes:
+                        continue
+                    path = None
+                    if key not in entry["reloadable"]:
+                        os.makedirs(self.spill_dir, exist_ok=True)
+                        path = os.path.join(self.spill_dir, f"{session_id}-{len(entry['evicted'])}.pkl")
+                        with open(path, "wb") as f:
+                            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    del state[key]
+                    entry["evicted"][key] = path
+                    released += size
+        return released
+
+    # --- Accounting ---
+    def usage(self):
+        """One row per live session: idle time, own and shared bytes, bytes per key."""
+        now = time.monotonic()
+        # Only the registry itself is read under the lock; walking the states
+        # can take seconds and touch() must not wait for it
+        with self._lock:
+            live = [(session_id, entry["last_seen"], sorted(entry["evicted"]), list(state.filtered_state.items()))
+                    for session_id, entry, state in self._live()]
+
+        reached = []
+        holders = {}
+        for session_id, last_seen, evicted, items in live:
+            per_key = {key: _reachable(value, {}) for key, value in items}
+            objects = {}
+            for sizes in per_key.values():
+                objects.update(sizes)
+            for obj_id in objects:
+                holders[obj_id] = holders.get(obj_id, 0) + 1
+            reached.append((session_id, last_seen, evicted, per_key, objects))
+
+        rows = []
+        for session_id, last_seen, evicted, per_key, objects in reached:
+            rows.append({
+                "session": session_id,
+                "idle_s": now - last_seen,
+                "own_bytes": sum(size for obj_id, size in objects.items() if holders[obj_id] == 1),
+                "shared_bytes": sum(size for obj_id, size in objects.items() if holders[obj_id] > 1),
+                "keys": {key: sum(sizes.values()) for key, sizes in per_key.items()},
+                "evicted": evicted,
+            })
+        return sorted(rows, key=lambda row: row["own_bytes"], reverse=True)
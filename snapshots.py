@@ -0,0 +1,246 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from scoring import AI_CATEGORIES, INPUT_COLUMNS, TIERS, score_arrays
+
+# Point-in-time history of client profiles and their scores.
+#
+# Snapshots are Parquet files in a history directory next to the data file,
+# listed in a small JSON manifest. A snapshot is either a full "base" or a
+# "delta" that holds only the clients whose profile or score changed plus
+# tombstones for removed clients. A base is written when the deltas since
+# the last one number BASE_EVERY or hold BASE_ROWS of the portfolio's rows,
+# which bounds how much a replay reads. Categorical columns are
+# dictionary-encoded, and trend() reads only the columns and the snapshots
+# that cover the requested period.
+#
+# Given the keyed changes since the last snapshot's version
+# (ClientStore.changes_between()), take() builds the delta from just those
+# clients, so an add, edit or delete scores and writes a few rows instead of
+# the whole portfolio. Other writes (imports, resets, and writes made without
+# a snapshot, e.g. by app 10) are rescored and diffed in full.
+#
+# Clients are keyed by name; if a name appears twice the last record wins.
+
+BASE_EVERY = 100
+BASE_ROWS = 0.5
+KEY = "Client"
+SCORE_COLUMNS = ["Estimated Revenue Opportunity", "Total Score", "Priority Tier", "AI Category"]
+TRACKED_COLUMNS = INPUT_COLUMNS[1:] + SCORE_COLUMNS
+DELETED = "_deleted"
+
+
+def scored_state(clients):
+    """Profiles plus scores, one row per client name, indexed by name."""
+    df_input = pd.DataFrame(clients, columns=INPUT_COLUMNS).drop_duplicates(KEY, keep="last")
+    if df_input.empty:
+        return pd.DataFrame(columns=TRACKED_COLUMNS, index=pd.Index([], name=KEY))
+    scored = score_arrays(df_input)
+    state = df_input.set_index(KEY)
+    state["Estimated Revenue Opportunity"] = scored["revenue"]
+    state["Total Score"] = scored["total_score"]
+    state["Priority Tier"] = pd.Categorical.from_codes(scored["tier"], TIERS)
+    state["AI Category"] = pd.Categorical.from_codes(scored["ai"], AI_CATEGORIES)
+    return state[TRACKED_COLUMNS]
+
+
+class SnapshotStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self._state = None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    # --- Manifest ---
+    def snapshots(self):
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)
+
+    def _write_manifest(self, entries):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    # --- Writing ---
+    def take(self, clients, label=None, version=None, changes=None):
+        """Record the current portfolio; returns the manifest entry, or None if nothing changed.
+
+        changes are the keyed changes that led from the last snapshot's
+        version to version; with them only the changed clients are scored.
+        """
+        with self._lock:
+            return self._take(clients, label, version, changes)
+
+    def _take(self, clients, label, version, changes):
+        os.makedirs(self.directory, exist_ok=True)
+        entries = self.snapshots()
+        if changes is not None and entries and _follows(entries[-1], version, changes):
+            frame = _change_delta(changes)
+            if frame.empty:
+                return None
+            if not self._base_due(entries, len(frame), len(clients)):
+                if self._state is not None:
+                    self._pending.append(frame)
+                return self._write(entries, "delta", frame, len(clients), label, version)
+
+        state = scored_state(clients)
+        previous = self.latest_state() if entries else None
+        if previous is None:
+            kind, frame = "base", state.assign(**{DELETED: False})
+        else:
+            frame = _delta(previous, state)
+            if frame.empty:
+                return None
+            kind = "delta"
+            if self._base_due(entries, len(frame), len(state)):
+                kind, frame = "base", state.assign(**{DELETED: False})
+        entry = self._write(entries, kind, frame, len(state), label, version)
+        self._state, self._pending = state, []
+        return entry
+
+    def _base_due(self, entries, rows, size):
+        # Deltas since the last base, counting the one about to be written
+        deltas, delta_rows = 1, rows
+        for entry in reversed(entries):
+            if entry["kind"] == "base":
+                break
+            deltas += 1
+            delta_rows += entry["rows"]
+        return deltas >= BASE_EVERY or delta_rows >= BASE_ROWS * max(size, 1)
+
+    def _write(self, entries, kind, frame, size, label, version):
+        snapshot_id = len(entries)
+        file_name = f"snapshot-{snapshot_id:06d}.parquet"
+        table = pa.Table.from_pandas(frame.reset_index(), preserve_index=False)
+        pq.write_table(table, os.path.join(self.directory, file_name))
+        entry = {
+            "id": snapshot_id,
+            "ts": time.time(),
+            "kind": kind,
+            "file": file_name,
+            "rows": len(frame),
+            "clients": size,
+            "label": label,
+            "version": version,
+        }
+        self._write_manifest(entries + [entry])
+        return entry
+
+    # --- Reading ---
+    def last_version(self):
+        """Store version of the latest snapshot, or None."""
+        entries = self.snapshots()
+        return entries[-1].get("version") if entries else None
+
+    def latest_state(self):
+        if self._state is None:
+            entries = self.snapshots()
+            self._state = self.state_at(entries[-1]["id"]) if entries else scored_state([])
+        elif self._pending:
+            # Keyed deltas are folded in when the state is next needed, not per write
+            for frame in self._pending:
+                self._state = _apply_delta(self._state, frame)
+        self._pending = []
+        return self._state
+
+    def state_at(self, snapshot_id, columns=None):
+        """Portfolio as of one snapshot, replayed from the nearest base."""
+        entries = [e for e in self.snapshots() if e["id"] <= snapshot_id]
+        if not entries:
+            return None
+        return self._replay(entries, len(entries) - 1, columns)[-1][1]
+
+    def trend(self, columns, start=None, end=None, clients=None):
+        """Long frame of (Snapshot, Timestamp, Client, *columns) for snapshots in [start, end].
+
+        start/end are epoch seconds. Only the requested columns are read, and
+        only from the snapshots needed to rebuild that period.
+        """
+        entries = [e for e in self.snapshots() if end is None or e["ts"] <= end]
+        first = next((i for i, e in enumerate(entries) if start is None or e["ts"] >= start), None)
+        frames = []
+        if first is not None:
+            for entry, state in self._replay(entries, first, columns, clients):
+                view = state.reset_index()
+                view.insert(0, "Timestamp", pd.to_datetime(entry["ts"], unit="s"))
+                view.insert(0, "Snapshot", entry["id"])
+                frames.append(view)
+        if not frames:
+            return pd.DataFrame(columns=["Snapshot", "Timestamp", KEY] + list(columns))
+        return pd.concat(frames, ignore_index=True)
+
+    def _replay(self, entries, first, columns=None, clients=None):
+        # Rebuild state from the last base at or before entries[first], and
+        # return (entry, state) for entries[first:]. With clients, only their
+        # rows are read, so each kept state is just those clients.
+        columns = list(columns or TRACKED_COLUMNS)
+        filters = pc.field(KEY).isin(pa.array(list(clients), pa.string())) if clients is not None else None
+        base = max(i for i in range(first + 1) if entries[i]["kind"] == "base")
+        states = []
+        state = None
+        for i, entry in enumerate(entries[base:], start=base):
+            frame = pq.read_table(
+                os.path.join(self.directory, entry["file"]), columns=[KEY, DELETED] + columns, filters=filters
+            ).to_pandas().set_index(KEY)
+            if entry["kind"] == "base":
+                state = frame.drop(columns=DELETED)
+            else:
+                state = _apply_delta(state, frame)
+            if i >= first:
+                states.append((entry, state))
+        return states
+
+
+def _delta(previous, state):
+    removed = previous.index.difference(state.index)
+    common = state.index.intersection(previous.index)
+    before = previous.loc[common, TRACKED_COLUMNS].astype(object)
+    after = state.loc[common, TRACKED_COLUMNS].astype(object)
+    changed = common[(before != after).any(axis=1).to_numpy()]
+    added = state.index.difference(previous.index)
+
+    frame = state.loc[changed.append(added)].assign(**{DELETED: False})
+    tombstones = previous.loc[removed].assign(**{DELETED: True})
+    if len(tombstones):
+        frame = pd.concat([frame, tombstones])
+    frame["Priority Tier"] = pd.Categorical(frame["Priority Tier"], categories=TIERS)
+    frame["AI Category"] = pd.Categorical(frame["AI Category"], categories=AI_CATEGORIES)
+    return frame
+
+
+def _follows(entry, version, changes):
+    # The changes lead exactly from the snapshot's version to version
+    return version is not None and entry.get("version") is not None and entry["version"] + len(changes) == version
+
+
+def _change_delta(changes):
+    # Last change per client name wins; a delete or rename tombstones the old name
+    rows = {}
+    for change in changes:
+        if change.old == change.new:
+            continue
+        if change.old is not None and (change.new is None or change.new[KEY] != change.old[KEY]):
+            rows[change.old[KEY]] = (change.old, True)
+        if change.new is not None:
+            rows[change.new[KEY]] = (change.new, False)
+    frame = scored_state([record for record, _ in rows.values()])
+    frame[DELETED] = [deleted for _, deleted in rows.values()]
+    return frame
+
+
+def _apply_delta(state, frame):
+    deleted = frame[DELETED].to_numpy(dtype=bool)
+    upserts = frame[~deleted].drop(columns=DELETED)
+    kept = state[~state.index.isin(frame.index)]
+    return pd.concat([kept, upserts]) if len(upserts) else kept
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+from scoring import get_scorer, round_thousands
+
+# Upgrade paths: which factor changes raise a client's opportunity the most.
+#
+# A step moves one of the ten categorical factors one level up or down. The
+# whole profile space is only 3**10 combinations, so the optimizer scores all
+# of them once into a grid of Total Scores. The best score reachable within k
+# steps of every profile then follows by expanding the grid k times: each
+# pass takes the maximum over the profile and its neighbours along every
+# axis (array shifts), remembering which profile it came from. Looking up a
+# client's codes in that grid gives the exact best k-step target, so ranking
+# the whole portfolio is a single fancy-indexing operation.
+#
+# Revenue is R&D Spend times Total Score (rounded to thousands), so for a
+# given client the best score is also the best revenue. Ties go to the target
+# with fewer steps. A path lists the target's unit steps in the order that
+# gains the most at each step.
+
+MAX_STEPS = 20
+
+
+class UpgradeOptimizer:
+    def __init__(self, scorer=None, columns=None):
+        self.scorer = scorer or get_scorer()
+        self.columns = list(self.scorer.levels)
+        # Factors a path may change; the others keep the client's level
+        self.movable = list(columns) if columns is not None else list(self.columns)
+        self.shape = tuple(len(self.scorer.levels[col]) for col in self.columns)
+
+        grid = np.indices(self.shape).reshape(len(self.shape), -1)
+        codes = {col: grid[axis] for axis, col in enumerate(self.columns)}
+        self.totals = self.scorer.score_encoded(codes, np.zeros(grid.shape[1]))["total_score"].reshape(self.shape)
+        # best[k] / target[k]: best Total Score within k steps and the flat index
+        # of that profile. Built up front (until nothing improves), so one
+        # optimizer can be shared between sessions.
+        self.best = [self.totals]
+        self.target = [np.arange(self.totals.size).reshape(self.shape)]
+        while len(self.best) <= MAX_STEPS and self._expand():
+            pass
+
+    def _expand(self):
+        # One more step: each profile takes the best of its neighbours' k-1 step results
+        best, target = self.best[-1].copy(), self.target[-1].copy()
+        previous_best, previous_target = self.best[-1], self.target[-1]
+        for col in self.movable:
+            axis = self.columns.index(col)
+            for shift in (1, -1):
+                # Value at the neighbour one level along this axis
+                src = [slice(None)] * len(self.shape)
+                dst = [slice(None)] * len(self.shape)
+                src[axis] = slice(shift, None) if shift > 0 else slice(None, shift)
+                dst[axis] = slice(None, -shift) if shift > 0 else slice(-shift, None)
+                src, dst = tuple(src), tuple(dst)
+                better = previous_best[src] > best[dst]
+                best[dst] = np.where(better, previous_best[src], best[dst])
+                target[dst] = np.where(better, previous_target[src], target[dst])
+        if np.array_equal(best, previous_best):
+            return False
+        self.best.append(best)
+        self.target.append(target)
+        return True
+
+    # --- Encoding ---
+    def codes_of(self, record):
+        return tuple(self.scorer.levels[col].index(record[col]) for col in self.columns)
+
+    def _record_of(self, record, codes):
+        changed = dict(record)
+        for col, code in zip(self.columns, codes):
+            changed[col] = self.scorer.levels[col][code]
+        return changed
+
+    def _revenue(self, spend, total):
+        return round(spend * float(total), -3)
+
+    # --- One client ---
+    def moves(self, record):
+        """Every single-step change of the profile, scored in one batch and ranked by revenue delta."""
+        base = np.array(self.codes_of(record))
+        variants, labels = [], []
+        for col in self.movable:
+            axis = self.columns.index(col)
+            for shift in (1, -1):
+                code = base[axis] + shift
+                if 0 <= code < self.shape[axis]:
+                    variant = base.copy()
+                    variant[axis] = code
+                    variants.append(variant)
+                    labels.append((col, self.scorer.levels[col][base[axis]], self.scorer.levels[col][code]))
+        if not variants:
+            return []
+        variants = np.array(variants)
+        spend = np.full(len(variants), float(record["R&D Spend"]))
+        scored = self.scorer.score_encoded({col: variants[:, axis] for axis, col in enumerate(self.columns)}, spend)
+        current = self._revenue(record["R&D Spend"], self.totals[tuple(base)])
+        rows = [{
+            "Factor": col,
+            "From": old,
+            "To": new,
+            "Estimated Revenue Opportunity": float(revenue),
+            "Revenue Delta": float(revenue) - current,
+        } for (col, old, new), revenue in zip(labels, scored["revenue"])]
+        return sorted(rows, key=lambda row: row["Revenue Delta"], reverse=True)
+
+    def best_path(self, record, k):
+        """The best profile within k steps and the order to take its steps in.
+
+        Returns a dict with the current and best revenue, the gain, the number
+        of steps, the gain per step and one row per step.
+        """
+        k = min(k, len(self.best) - 1)
+        codes = self.codes_of(record)
+        spend = record["R&D Spend"]
+        target = np.unravel_index(int(self.target[k][codes]), self.shape)
+
+        # Unit steps toward the target, taken greedily by immediate gain
+        position = list(codes)
+        steps = []
+        remaining = {axis: int(target[axis]) - codes[axis] for axis in range(len(codes)) if target[axis] != codes[axis]}
+        while remaining:
+            options = []
+            for axis, delta in remaining.items():
+                moved = list(position)
+                moved[axis] += 1 if delta > 0 else -1
+                options.append((self.totals[tuple(moved)], -axis, axis, moved))
+            total, _, axis, moved = max(options)
+            col = self.columns[axis]
+            steps.append({
+                "Factor": col,
+                "From": self.scorer.levels[col][position[axis]],
+                "To": self.scorer.levels[col][moved[axis]],
+                "Estimated Revenue Opportunity": self._revenue(spend, total),
+            })
+            position = moved
+            remaining[axis] -= 1 if remaining[axis] > 0 else -1
+            if not remaining[axis]:
+                del remaining[axis]
+
+        current = self._revenue(spend, self.totals[codes])
+        previous = current
+        for step in steps:
+            step["Revenue Delta"] = step["Estimated Revenue Opportunity"] - previous
+            previous = step["Estimated Revenue Opportunity"]
+        best = self._revenue(spend, self.best[k][codes])
+        return {
+            "current": current,
+            "best": best,
+            "gain": best - current,
+            "steps": len(steps),
+            "gain_per_step": (best - current) / len(steps) if steps else 0.0,
+            "target": self._record_of(record, target),
+            "path": steps,
+        }
+
+    # --- Whole portfolio ---
+    def portfolio(self, clients, k):
+        """Best k-step gain of every client, ranked by revenue gain per step."""
+        df_input = pd.DataFrame(clients, columns=self.scorer.input_columns)
+        return self.rank_encoded(df_input["Client"].to_numpy(), self.scorer.encode(df_input), df_input["R&D Spend"], k)
+
+    def rank_encoded(self, names, codes, spend, k):
+        """portfolio() for already-encoded profiles (level codes per column, as for score_encoded())."""
+        k = min(k, len(self.best) - 1)
+        index = tuple(codes[col] for col in self.columns)
+        spend = np.asarray(spend, dtype=float)
+        current = round_thousands(spend * self.totals[index])
+        best = round_thousands(spend * self.best[k][index])
+        target = np.unravel_index(self.target[k][index], self.shape)
+        steps = sum(np.abs(target[axis] - codes[col]) for axis, col in enumerate(self.columns))
+        gain = best - current
+        df = pd.DataFrame({
+            "Client": names,
+            "Estimated Revenue Opportunity": current,
+            "Best Revenue": best,
+            "Revenue Gain": gain,
+            "Steps": steps,
+            "Gain per Step": np.divide(gain, steps, out=np.zeros(len(gain)), where=steps > 0),
+        })
+        return df.sort_values("Gain per Step", ascending=False, kind="stable").reset_index(drop=True)
@@ -0,0 +1,179 @@
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+
+from scoring import LEVELS
+
+# Load-time validation of stored client records.
+#
+# The schema: the name must be present, R&D Spend a finite non-negative
+# number and every categorical field one of the scoring levels. Values of the
+# wrong type (a list, a number for a level, text for the spend) are invalid
+# rather than errors, so one odd record cannot stop a load.
+#
+# check_frame() checks a frame of records in one vectorized pass per column
+# (bulk imports). validate_clients() checks stored records as they are
+# parsed, CHUNK records at a time: check_records() pulls each column out of
+# the chunk once and checks and encodes it as a whole, with no intermediate
+# DataFrame, so one pass both validates and builds the engine's input.
+# Either way the valid rows come out already encoded and scoring them needs
+# no further lookups or checks, and reasons are only spelled out for rows
+# that fail.
+#
+# ClientStore runs validate_clients() on every fresh load (see
+# portfolio.get_store()): invalid rows are quarantined to a side file with
+# their reasons and the rest of the app only ever sees the clean records.
+
+CHUNK = 50_000
+
+
+def check_frame(df):
+    """Vectorized schema check of a frame of records.
+
+    Returns (bad, reasons, codes, spend): a mask of invalid rows, reasons per
+    invalid row position, level codes per categorical column and R&D Spend
+    as floats, for every row.
+    """
+    n = len(df)
+    bad = np.zeros(n, dtype=bool)
+    reasons = {}
+
+    def fail(mask, reason_of):
+        for i in np.flatnonzero(mask):
+            reasons.setdefault(int(i), []).append(reason_of(i))
+        bad[mask] = True
+
+    names = df["Client"] if "Client" in df else pd.Series([None] * n)
+    blank = (names.isna() | (names.astype(str).str.strip() == "")).to_numpy(dtype=bool)
+    fail(blank, lambda i: "missing client name")
+
+    raw = df["R&D Spend"] if "R&D Spend" in df else pd.Series([None] * n)
+    spend = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=float)
+    invalid = ~np.isfinite(spend) | (spend < 0)
+    if raw.dtype == object:
+        # Numbers stored as text would score here but break per-record code paths
+        invalid |= raw.map(lambda v: isinstance(v, (str, bool))).to_numpy(dtype=bool)
+    fail(invalid, lambda i: f"R&D Spend {raw.iloc[i]!r} is not a non-negative number")
+
+    codes = {}
+    for col, levels in LEVELS.items():
+        values = df[col] if col in df else pd.Series([None] * n)
+        text = values.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+        # Lists and dicts (JSON uploads) are unhashable; they fail like any other non-level value
+        codes[col] = np.asarray(pd.Categorical(values.where(text), categories=levels).codes)
+        fail(codes[col] < 0, lambda i: f"missing {col}" if _missing(values.iloc[i])
+             else f"{col} {values.iloc[i]!r} is not one of {', '.join(levels)}")
+    return bad, reasons, codes, spend
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def check_records(records):
+    """check_frame() for a list of record dicts, without building a DataFrame.
+
+    Returns (bad, codes, spend). Every column is pulled out of the records
+    once; type checks run over the whole column (set(map(type, ...))) and
+    only columns holding a wrong type are looked at value by value.
+    """
+    n = len(records)
+    rows = records
+    bad = np.zeros(n, dtype=bool)
+    if set(map(type, records)) != {dict}:
+        bad = np.fromiter((not isinstance(r, dict) for r in records), bool, n)
+        rows = [r if isinstance(r, dict) else {} for r in records]
+
+    names = [r.get("Client") for r in rows]
+    if set(map(type, names)) == {str}:
+        if not all(map(str.strip, names)):
+            bad |= np.fromiter((not v.strip() for v in names), bool, n)
+    else:
+        bad |= np.fromiter((type(v) is not str or not v.strip() for v in names), bool, n)
+
+    raw = [r.get("R&D Spend") for r in rows]
+    if set(map(type, raw)) <= {int, float}:
+        spend = np.fromiter(raw, float, n)
+    else:
+        # bool is a subclass of int, so check the exact type
+        number = np.fromiter((type(v) in (int, float) for v in raw), bool, n)
+        spend = np.fromiter((v if ok else math.nan for v, ok in zip(raw, number)), float, n)
+    bad |= ~(np.isfinite(spend) & (spend >= 0))
+
+    codes = {}
+    for col, levels in LEVELS.items():
+        code_of = {level: i for i, level in enumerate(levels)}
+        values = [r.get(col) for r in rows]
+        if set(map(type, values)) != {str}:
+            # Anything but a string (a list or dict is not even hashable) is not a level
+            values = [v if type(v) is str else None for v in values]
+        codes[col] = np.fromiter(map(code_of.get, values, itertools.repeat(-1)), np.int8, n)
+        bad |= codes[col] < 0
+    return bad, codes, spend
+
+
+def record_reasons(record):
+    """Why one record fails the schema, from the same checks as check_frame()."""
+    reasons = []
+    name = record.get("Client")
+    if name is None or not str(name).strip():
+        reasons.append("missing client name")
+    elif not isinstance(name, str):
+        reasons.append(f"client name {name!r} is not text")
+    spend = record.get("R&D Spend")
+    if type(spend) not in (int, float) or not 0 <= spend < math.inf:
+        reasons.append(f"R&D Spend {spend!r} is not a non-negative number")
+    for col, levels in LEVELS.items():
+        if record.get(col) is None:
+            reasons.append(f"missing {col}")
+        elif not isinstance(record[col], str) or record[col] not in levels:
+            reasons.append(f"{col} {record[col]!r} is not one of {', '.join(levels)}")
+    return reasons
+
+
+def validate_clients(records, chunk_size=CHUNK):
+    """Split stored records (any iterable, e.g. a streaming parse) into clean ones and rejects.
+
+    Returns (clean, encoded, rejected): the clean records, {"names",
+    "codes", "spend"} for them in the same order, and one {"record",
+    "reasons"} per rejected record.
+    """
+    clean, rejected = [], []
+    names, spends, codes = [], [], {col: [] for col in LEVELS}
+    level_values = {col: np.array(levels, dtype=object) for col, levels in LEVELS.items()}
+    for batch in _batches(records, chunk_size):
+        bad, batch_codes, spend = check_records(batch)
+        if bad.any():
+            rejected.extend({"record": record, "reasons": record_reasons(record) if isinstance(record, dict)
+                             else ["not a client record"]} for record, b in zip(batch, bad) if b)
+            good = ~bad
+            batch = list(itertools.compress(batch, good))
+            batch_codes = {col: values[good] for col, values in batch_codes.items()}
+            spend = spend[good]
+        for col, values in batch_codes.items():
+            codes[col].append(values)
+            # One shared string per level instead of one parsed copy per record
+            for record, level in zip(batch, level_values[col][values].tolist()):
+                record[col] = level
+        clean.extend(batch)
+        names.extend(record["Client"] for record in batch)
+        spends.append(spend)
+    encoded = {
+        "names": np.array(names, dtype=object),
+        "codes": {col: np.concatenate(parts) if parts else np.zeros(0, np.int8) for col, parts in codes.items()},
+        "spend": np.concatenate(spends) if spends else np.zeros(0),
+    }
+    return clean, encoded, rejected
@@ -0,0 +1,251 @@
+import json
+import os
+import sys
+import tempfile
+import traceback
+
+# Regression checks for inputs that once crashed a code path instead of
+# being rejected: odd stored records, scoring API bodies, model query plans
+# and the like.
+#
+#   python verify_inputs.py
+#
+# Each test_* function raises AssertionError on failure. The script runs them
+# all and exits non-zero if any failed; python -m pytest verify_inputs.py
+# runs the same functions.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+
+def profile(name="Acme Pharma", spend=250_000_000, **values):
+    """A valid client record, with some fields replaced."""
+    from scoring import LEVELS
+    return {"Client": name, "R&D Spend": spend, **{col: levels[0] for col, levels in LEVELS.items()}, **values}
+
+
+# --- Stored records ---
+def test_list_valued_field_is_quarantined():
+    from client_store import ClientStore
+    from validation import validate_clients
+    for compression in (None, "gzip"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "client_data.json")
+            bad = profile("Listed", Footprint=["Global"])
+            ClientStore(path, compression=compression).compare_and_swap(0, [profile(), bad, profile("Other")])
+            store = ClientStore(path, validator=validate_clients)
+            version, clients = store.read()
+            assert [c["Client"] for c in clients] == ["Acme Pharma", "Other"], clients
+            quarantined = store.quarantined()
+            assert [entry["record"]["Client"] for entry in quarantined] == ["Listed"], quarantined
+            assert "Footprint" in quarantined[0]["reasons"][0], quarantined
+
+
+def test_record_reasons_wrong_types():
+    from validation import record_reasons
+    assert record_reasons(profile()) == []
+    for field, value in [("R&D Spend", "1000"), ("R&D Spend", None), ("R&D Spend", float("inf")),
+                         ("R&D Spend", float("nan")), ("R&D Spend", True), ("R&D Spend", -1),
+                         ("Footprint", ["Global"]), ("Footprint", {"level": "Global"}), ("Footprint", 3),
+                         ("Client", ["Acme"])]:
+        reasons = record_reasons(profile(**{field: value}))
+        assert len(reasons) == 1 and repr(value) in reasons[0], (field, value, reasons)
+
+
+def test_check_frame_unhashable_values():
+    import pandas as pd
+    from validation import check_frame
+    df = pd.DataFrame([profile(), profile("Listed", Footprint=["Global"]), profile("Inf", spend=float("inf"))])
+    bad, reasons, _, _ = check_frame(df)
+    assert bad.tolist() == [False, True, True], reasons
+    assert "Footprint" in reasons[1][0] and "inf" in reasons[2][0], reasons
+
+
+def test_unreadable_arrow_copy_falls_back_to_json():
+    import subprocess
+    from client_store import ClientStore, arrow_path_for
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "client_data.json")
+        ClientStore(path, compression="gzip", arrow=False).compare_and_swap(0, [profile(), profile("Beta")])
+        with open(arrow_path_for(path), "wb") as f:
+            f.write(b"ARROW1\0\0 not really")
+        version, clients = ClientStore(path).read()
+        assert version == 1 and [c["Client"] for c in clients] == ["Acme Pharma", "Beta"], clients
+        assert not os.path.exists(arrow_path_for(path))
+
+        # A copy left by a host with pyarrow, read where it is not installed
+        with open(arrow_path_for(path), "wb") as f:
+            f.write(b"ARROW1")
+        script = ("import sys; sys.modules['pyarrow'] = None; from client_store import ClientStore; "
+                  f"print(len(ClientStore({path!r}).read()[1]))")
+        result = subprocess.run([sys.executable, "-c", script], cwd=REPO_DIR, capture_output=True, text=True)
+        assert result.returncode == 0 and result.stdout.strip() == "2", result.stderr
+        assert not os.path.exists(arrow_path_for(path))
+
+
+# --- Scoring API ---
+def post(server, path, body, content_type="application/json"):
+    """(status, parsed JSON) of a POST to a running scoring_api server."""
+    import http.client
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        connection.request("POST", path, data, {"Content-Type": content_type})
+        response = connection.getresponse()
+        # json.loads accepts NaN; a strict parser is what API clients use
+        return response.status, json.loads(response.read(), parse_constant=_reject_constant)
+    finally:
+        connection.close()
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+
+def api_server():
+    import threading
+    from scoring_api import make_server
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_score_rejects_bad_bodies():
+    server = api_server()
+    try:
+        status, answer = post(server, "/score", profile())
+        assert status == 200 and answer["Client"] == "Acme Pharma", answer
+        for body in [profile(spend="1000"), profile(spend=None), profile(Footprint=["Global"]), 5, [profile()], None,
+                     {"Client": "Acme"}]:
+            status, answer = post(server, "/score", body)
+            assert status == 400 and answer["reasons"], (body, status, answer)
+        status, answer = post(server, "/score", b"{not json")
+        assert status == 400, answer
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_score_batch_rejects_bad_bodies():
+    server = api_server()
+    try:
+        status, answer = post(server, "/score/batch", [profile(), profile("Beta")])
+        assert status == 200 and [row["Client"] for row in answer] == ["Acme Pharma", "Beta"], answer
+        status, answer = post(server, "/score/batch", [])
+        assert status == 200 and answer == [], answer
+        for bad in [profile(spend=None), profile(spend="1000"), profile(Footprint=["Global"]), 5, None]:
+            status, answer = post(server, "/score/batch", [profile(), bad])
+            assert status == 400 and [item["index"] for item in answer["reasons"]] == [1], (bad, status, answer)
+        status, answer = post(server, "/score/batch", {"clients": [profile()]})
+        assert status == 400, answer
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_score_batch_arrow_rejects_null_spend():
+    import pandas as pd
+    import pyarrow as pa
+    from scoring_api import ARROW_STREAM
+    server = api_server()
+    try:
+        table = pa.Table.from_pandas(pd.DataFrame([profile(), profile("Null", spend=None)]), preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        status, answer = post(server, "/score/batch", sink.getvalue().to_pybytes(), ARROW_STREAM)
+        assert status == 400 and [item["index"] for item in answer["reasons"]] == [1], (status, answer)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# --- Query plans ---
+def canned(reply):
+    """A query_plan complete() function that always returns reply."""
+    return lambda messages: reply if isinstance(reply, str) else json.dumps(reply)
+
+
+def test_plan_sort_keys_must_be_answer_columns():
+    import query_plan
+    from scoring import LEVELS
+    clients = [profile("Acme", 100_000_000), profile("Beta", 300_000_000, Footprint=LEVELS["Footprint"][2]),
+               profile("Gamma", 200_000_000, Footprint=LEVELS["Footprint"][2])]
+    table = query_plan.portfolio_table(clients)
+    rejected = [
+        # Grouped answers only have the group keys and the aggregate
+        {"group_by": ["Footprint"], "sort": [{"column": "R&D Spend", "descending": True}]},
+        {"group_by": ["Footprint"], "aggregate": {"column": "R&D Spend", "func": "sum"},
+         "sort": [{"column": "R&D Spend"}]},
+        {"aggregate": {"column": "R&D Spend", "func": "sum"}, "sort": [{"column": "Client"}]},
+        # Only the shown columns are left to sort by
+        {"columns": ["R&D Spend"], "sort": [{"column": "Total Score"}]},
+        {"sort": [{"column": "value"}]},
+        {"sort": [{"column": "Nope"}]},
+    ]
+    for reply in rejected:
+        try:
+            query_plan.ask("question", table, canned(reply))
+        except query_plan.PlanError:
+            pass
+        else:
+            raise AssertionError(f"plan accepted: {reply}")
+
+    plan, answer = query_plan.ask("question", table, canned(
+        {"group_by": ["Footprint"], "aggregate": {"column": "R&D Spend", "func": "sum"},
+         "sort": [{"column": "value", "descending": True}]}))
+    assert answer.iloc[0].tolist() == [LEVELS["Footprint"][2], 500_000_000], answer
+    plan, answer = query_plan.ask("question", table, canned(
+        {"columns": ["R&D Spend"], "sort": [{"column": "R&D Spend", "descending": True}], "limit": 2}))
+    assert answer["Client"].tolist() == ["Beta", "Gamma"], answer
+    plan, answer = query_plan.ask("question", table, canned(
+        {"sort": [{"column": "Client", "descending": True}]}))
+    assert answer["Client"].tolist() == ["Gamma", "Beta", "Acme"], answer
+
+
+def test_plan_filter_values_must_match_the_column():
+    import query_plan
+    table = query_plan.portfolio_table([profile("Acme"), profile("Beta")])
+    rejected = [
+        {"column": "Client", "op": "==", "value": ["Acme", "Beta"]},
+        {"column": "Client", "op": "!=", "value": {"name": "Acme"}},
+        {"column": "Client", "op": "==", "value": 5},
+        {"column": "Client", "op": "in", "value": [["Acme"], "Beta"]},
+        {"column": "Client", "op": "not in", "value": [None]},
+        {"column": "Client", "op": "contains", "value": ["Ac"]},
+        {"column": "Footprint", "op": "contains", "value": {"a": 1}},
+        {"column": "Footprint", "op": "==", "value": ["Global"]},
+    ]
+    for item in rejected:
+        try:
+            query_plan.ask("question", table, canned({"filters": [item]}))
+        except query_plan.PlanError:
+            pass
+        else:
+            raise AssertionError(f"filter accepted: {item}")
+
+    for item, expected in [({"column": "Client", "op": "==", "value": "Beta"}, ["Beta"]),
+                           ({"column": "Client", "op": "in", "value": ["Acme", "Nope"]}, ["Acme"]),
+                           ({"column": "Client", "op": "contains", "value": "ET"}, ["Beta"])]:
+        plan, answer = query_plan.ask("question", table, canned({"filters": [item]}))
+        assert answer["Client"].tolist() == expected, (item, answer)
+
+
+def main():
+    tests = [(name, fn) for name, fn in globals().items() if name.startswith("test_") and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+        except Exception:
+            failed += 1
+            print(f"  {name:<45} FAILED")
+            traceback.print_exc()
+        else:
+            print(f"  {name:<45} ok")
+    print("PASSED" if not failed else f"FAILED ({failed} of {len(tests)})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
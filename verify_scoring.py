@@ -0,0 +1,298 @@
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+# Golden-equivalence and performance checks for the scoring engines.
+#
+#   python verify_scoring.py golden [--spends 0,1500,...]
+#   python verify_scoring.py perf [--clients N] [--slack X]
+#   python verify_scoring.py            (both)
+#
+# golden scores every one of the 3**10 factor combinations at each R&D Spend
+# in SPENDS with reference_frames(), a copy of the original iterrows() loop
+# from app.py, and requires every engine to give exactly the same revenue
+# (round(spend * total_score, -3) included), Priority Tier, components and
+# AI Roadmap. perf scores a synthetic portfolio with each engine and fails
+# when one is slower than its PERF_TARGETS budget. The exit status is non-zero
+# on any failure, so the script can gate a change like a test suite would.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+# Spend values around rounding edges (half-thousands) and across the scale
+SPENDS = [0, 1, 499, 500, 1_500, 2_500, 999_999, 1_000_000, 123_456_789, 1_234_567_891, 19_999_000_000]
+
+# Seconds allowed per 1M clients
+PERF_TARGETS = {
+    "score_clients": 8.0,
+    "score_table": 1.5,
+    "score_encoded": 0.5,
+    "validate_clients": 5.0,
+}
+
+
+# --- Reference ---
+def reference_frames(clients):
+    """The original scoring loop from app.py, kept verbatim as the golden reference."""
+    import pandas as pd
+
+    score_map = {"Low": 3, "Medium": 2, "High": 1}
+    inv_map = {"Outdated": 3, "Developing": 2, "Advanced": 1}
+    platform_map = {"On-Prem": 3, "Hybrid": 2, "Cloud-Native": 1}
+    product_map = {"Basic": 3, "Intermediate": 2, "Comprehensive": 1}
+    size_map = {"Local": 1, "Regional": 2, "Global": 3}
+    ta_map = {"Niche": 1, "Moderate": 2, "Broad": 3}
+    pipeline_map = {"Simple": 1, "Moderate": 2, "Complex": 3}
+
+    weights = {
+        "Tech Strategy": 0.10,
+        "Data Platforms": 0.08,
+        "Data Products": 0.06,
+        "AI Opportunity": 0.10,
+        "Client Size": 0.04,
+        "TA Breadth": 0.04,
+        "Pipeline Complexity": 0.04,
+        "Digital Maturity": 0.04,
+    }
+
+    df_input = pd.DataFrame(clients)
+    results = []
+    maturity = []
+
+    for _, row in df_input.iterrows():
+        scores = {
+            "Tech Strategy": inv_map[row["Tech Maturity"]],
+            "Data Platforms": platform_map[row["Data Platform"]],
+            "Data Products": product_map[row["Data Products"]],
+            "AI Appetite": score_map[row["AI Appetite"]],
+            "AI Maturity": score_map[row["AI Maturity"]],
+            "AI Adoption": score_map[row["AI Adoption"]],
+            "Client Size": size_map[row["Footprint"]],
+            "TA Breadth": ta_map[row["TA Focus"]],
+            "Pipeline Complexity": pipeline_map[row["Pipeline"]],
+            "Digital Maturity": score_map[row["Digital Maturity"]],
+        }
+
+        ai_total = scores["AI Appetite"] + scores["AI Maturity"] + scores["AI Adoption"]
+        if ai_total >= 7:
+            ai_weight = weights["AI Opportunity"]
+            ai_roadmap = "Implement enterprise AI/GenAI platform"
+        elif ai_total >= 5:
+            ai_weight = weights["AI Opportunity"] * 0.6
+            ai_roadmap = "Run AI/GenAI pilot with scalable infra"
+        else:
+            ai_weight = weights["AI Opportunity"] * 0.3
+            ai_roadmap = "Build awareness and assess AI readiness"
+
+        components = {
+            "Tech Strategy": weights["Tech Strategy"] * scores["Tech Strategy"] / 3,
+            "Data Platforms": weights["Data Platforms"] * scores["Data Platforms"] / 3,
+            "Data Products": weights["Data Products"] * scores["Data Products"] / 3,
+            "AI/GenAI": ai_weight,
+            "Client Size": weights["Client Size"] * scores["Client Size"] / 3,
+            "TA Breadth": weights["TA Breadth"] * scores["TA Breadth"] / 3,
+            "Pipeline Complexity": weights["Pipeline Complexity"] * scores["Pipeline Complexity"] / 3,
+            "Digital Maturity": weights["Digital Maturity"] * scores["Digital Maturity"] / 3,
+        }
+
+        total_score = sum(components.values())
+        revenue = round(row["R&D Spend"] * total_score, -3)
+
+        results.append({
+            "Client": row["Client"],
+            "Estimated Revenue Opportunity": revenue,
+            "Priority Tier": "HIGH" if total_score > 0.66 else "MEDIUM" if total_score > 0.4 else "LOW",
+            **components
+        })
+
+        maturity.append({
+            "Client": row["Client"],
+            "AI Roadmap": ai_roadmap
+        })
+
+    return pd.DataFrame(results), pd.DataFrame(maturity)
+
+
+def all_profiles(spends=SPENDS):
+    """Every combination of the ten factors at every spend."""
+    from scoring import LEVELS
+    clients = []
+    for spend in spends:
+        for combo in itertools.product(*LEVELS.values()):
+            clients.append({"Client": f"Client {len(clients):07d}", "R&D Spend": spend, **dict(zip(LEVELS, combo))})
+    return clients
+
+
+# --- Engines ---
+def engine_frame(clients):
+    from scoring import score_clients
+    return score_clients(clients)
+
+
+def engine_chunks(clients):
+    import pandas as pd
+    from scoring import iter_scored_chunks
+    chunks = list(iter_scored_chunks(clients, chunk_size=100_000))
+    return (pd.concat([c[0] for c in chunks], ignore_index=True),
+            pd.concat([c[1] for c in chunks], ignore_index=True))
+
+
+def engine_record(clients):
+    import pandas as pd
+    from scoring import AI_ROADMAPS, score_record
+    rows, roadmaps = [], []
+    for client in clients:
+        row, ai = score_record(client)
+        rows.append(row)
+        roadmaps.append({"Client": client["Client"], "AI Roadmap": AI_ROADMAPS[ai]})
+    return pd.DataFrame(rows), pd.DataFrame(roadmaps)
+
+
+def engine_arrow(clients):
+    from columnar import clients_to_table, score_table
+    return score_table(clients_to_table(clients))
+
+
+def engine_store(clients):
+    # Compressed store round trip, validated and scored from its encoded columns
+    import portfolio
+    from client_store import ClientStore
+    from validation import validate_clients
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "client_data.json")
+        ClientStore(path, compression="gzip", arrow=False).compare_and_swap(0, clients)
+        store = ClientStore(path, validator=validate_clients, arrow=False)
+        version, stored = store.read()
+        return portfolio._score(store, version, stored)
+
+
+def engine_store_arrow(clients):
+    # Store loaded from its Arrow copy, scored from the copy's encoding
+    import portfolio
+    from client_store import ClientStore
+    from validation import validate_clients
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "client_data.json")
+        writer = ClientStore(path, compression="gzip", validator=validate_clients)
+        writer.compare_and_swap(0, clients)
+        assert writer.sync_arrow(), "no Arrow copy written"
+        store = ClientStore(path, validator=validate_clients)
+        version, stored = store.read()
+        assert store.encoded(version) is not None
+        os.remove(store.arrow_path)
+        frames = portfolio._score(store, version, stored)
+        # Records come back as the JSON load gives them
+        assert stored == [dict(c) for c in clients]
+        return frames
+
+
+ENGINES = {
+    "score_clients": engine_frame,
+    "iter_scored_chunks": engine_chunks,
+    "score_record": engine_record,
+    "columnar.score_table": engine_arrow,
+    "stored gzip + validation": engine_store,
+    "stored Arrow copy": engine_store_arrow,
+}
+
+
+# --- Checks ---
+def compare(reference, frames):
+    """Mismatch descriptions between the reference frames and an engine's; empty if identical."""
+    import numpy as np
+    ref_results, ref_maturity = reference
+    df_results, df_maturity = frames
+    problems = []
+    if len(df_results) != len(ref_results):
+        return [f"{len(df_results):,} rows instead of {len(ref_results):,}"]
+    checks = [(col, ref_results[col], df_results[col]) for col in ref_results.columns]
+    checks.append(("AI Roadmap", ref_maturity["AI Roadmap"], df_maturity["AI Roadmap"]))
+    for col, expected, actual in checks:
+        if expected.dtype.kind not in "fi":
+            expected, actual = expected.astype(str).to_numpy(), actual.astype(str).to_numpy()
+        else:
+            expected, actual = expected.to_numpy(dtype=float), actual.to_numpy(dtype=float)
+        diff = np.flatnonzero(expected != actual)
+        if len(diff):
+            i = diff[0]
+            problems.append(f"{col}: {len(diff):,} rows differ, e.g. {ref_results['Client'].iloc[i]} "
+                            f"expected {expected[i]!r}, got {actual[i]!r}")
+    return problems
+
+
+def run_golden(spends):
+    clients = all_profiles(spends)
+    print(f"Golden check: {len(clients):,} profiles ({len(spends)} spends x 3**10 combinations)")
+    start = time.perf_counter()
+    reference = reference_frames(clients)
+    print(f"  reference (iterrows)        {time.perf_counter() - start:7.2f} s")
+    failed = False
+    for name, engine in ENGINES.items():
+        start = time.perf_counter()
+        problems = compare(reference, engine([dict(c) for c in clients]))
+        status = "ok" if not problems else "FAILED"
+        print(f"  {name:<27} {time.perf_counter() - start:7.2f} s  {status}")
+        for problem in problems:
+            print(f"    {problem}")
+        failed |= bool(problems)
+    return not failed
+
+
+def run_perf(n_clients, slack):
+    import pandas as pd
+    from bench import synthetic_clients
+    from columnar import clients_to_table, score_table
+    from scoring import INPUT_COLUMNS, encode, score_clients, score_encoded
+    from validation import validate_clients
+
+    clients = synthetic_clients(n_clients)
+    table = clients_to_table(clients)
+    df_input = pd.DataFrame(clients, columns=INPUT_COLUMNS)
+    codes, spend = encode(df_input), df_input["R&D Spend"].to_numpy(dtype=float)
+    runs = {
+        "score_clients": lambda: score_clients(clients),
+        "score_table": lambda: score_table(table),
+        "score_encoded": lambda: score_encoded(codes, spend),
+        "validate_clients": lambda: validate_clients([dict(c) for c in clients]),
+    }
+    print(f"Performance check: {n_clients:,} clients")
+    failed = False
+    for name, run in runs.items():
+        # Best of three, so one slow run on a busy machine does not fail the check
+        seconds = min(_timed(run) for _ in range(3))
+        budget = PERF_TARGETS[name] * n_clients / 1_000_000 * slack
+        status = "ok" if seconds <= budget else "TOO SLOW"
+        print(f"  {name:<17} {seconds:7.3f} s  (budget {budget:.3f} s)  {status}")
+        failed |= seconds > budget
+    return not failed
+
+
+def _timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scoring golden-equivalence and performance checks")
+    parser.add_argument("command", nargs="?", choices=["golden", "perf", "all"], default="all")
+    parser.add_argument("--spends", default=",".join(str(s) for s in SPENDS),
+                        help="comma-separated R&D Spend values for the golden check")
+    parser.add_argument("--clients", type=int, default=1_000_000, help="portfolio size for the perf check")
+    parser.add_argument("--slack", type=float, default=1.0, help="multiply every perf budget by this")
+    args = parser.parse_args(argv)
+
+    ok = True
+    if args.command in ("golden", "all"):
+        ok &= run_golden([int(s) for s in args.spends.split(",")])
+    if args.command in ("perf", "all"):
+        ok &= run_perf(args.clients, args.slack)
+    print("PASSED" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())